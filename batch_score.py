@@ -0,0 +1,323 @@
+"""Score household profile files from the command line.
+
+Reads CSV or Parquet input in fixed-size chunks, scores each chunk with the
+same engine the Calculate tab uses and appends the per-category results and
+certificate tier to the output file, so memory use does not grow with the
+input size.
+
+    python batch_score.py profiles.csv scores.csv --chunksize 100000
+    python batch_score.py profiles.parquet scores.parquet --workers 0
+    python batch_score.py profiles.parquet --benchmark --workers 32
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+import emissions
+import factors
+import uncertainty
+
+# Input column -> default used when the column is missing
+INPUT_COLUMNS = {
+    "transport_mode": None,
+    "distance_km": None,
+    "flights": 0,
+    "electricity_kwh": None,
+    "cooking_fuel": None,
+    "fuel_kg": 0.0,
+    "organic_kg": 0.0,
+    "plastic_kg": 0.0,
+    "paper_kg": 0.0,
+    "metal_kg": 0.0,
+    "meals_per_day": None,
+    "diet": None,
+}
+# Optional per-row region name; rows without one use --region
+REGION_COLUMN = "region"
+WASTE_COLUMNS = [f"{waste_type.lower()}_kg" for waste_type in emissions.WASTE_TYPES]
+DEFAULT_CHUNKSIZE = 100_000
+MAX_REPORTED_ROWS = 5  # Blank required values listed in an error
+
+
+def _is_parquet(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in (".parquet", ".pq")
+
+
+def read_chunks(path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """Yield the input file as DataFrames of at most `chunksize` rows,
+    indexed by row position in the file."""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        start = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            chunk = batch.to_pandas()
+            chunk.index += start
+            start += len(chunk)
+            yield chunk
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def _region_rows(chunk: pd.DataFrame, region, store: factors.FactorStore) -> np.ndarray:
+    """Resolve the factor set row for every profile in `chunk`."""
+    if REGION_COLUMN not in chunk.columns:
+        return store.resolve(region)
+    version = region[1] if isinstance(region, tuple) else None
+    default = region[0] if isinstance(region, tuple) else region
+    names, inverse = np.unique(chunk[REGION_COLUMN].fillna(default).astype(str).to_numpy(),
+                               return_inverse=True)
+    rows = np.array([store.row(name, version) for name in names], dtype=np.intp)
+    return rows[inverse]
+
+
+def score_chunk(chunk: pd.DataFrame, region=emissions.DEFAULT_REGION,
+                store: Optional[factors.FactorStore] = None, samples: int = 0) -> pd.DataFrame:
+    """Return `chunk` with per-category, total and certificate columns added.
+
+    `region` is a region name or (region, version) pair used for rows
+    without their own `region` column value. With `samples`, Monte Carlo
+    percentile columns (e.g. `total_p95_kg`) are added as well.
+    """
+    store = store or factors.DEFAULT_STORE
+    missing = [column for column, default in INPUT_COLUMNS.items()
+               if default is None and column not in chunk.columns]
+    if missing:
+        raise ValueError(f"Input is missing required columns: {', '.join(missing)}")
+    for name, default in INPUT_COLUMNS.items():
+        blank = chunk.index[chunk[name].isna()] if default is None else ()
+        if len(blank):
+            rows = ", ".join(str(row + 1) for row in blank[:MAX_REPORTED_ROWS])
+            more = f" and {len(blank) - MAX_REPORTED_ROWS} more" if len(blank) > MAX_REPORTED_ROWS else ""
+            raise ValueError(f"Required column {name} is blank in data row(s) {rows}{more}")
+
+    def column(name):
+        if name in chunk.columns:
+            if INPUT_COLUMNS[name] is None:
+                return chunk[name].to_numpy()
+            return chunk[name].fillna(INPUT_COLUMNS[name]).to_numpy()
+        return np.full(len(chunk), INPUT_COLUMNS[name], dtype=np.float64)
+
+    rows = _region_rows(chunk, region, store)
+    inputs = dict(
+        distance=column("distance_km"),
+        transport_mode=emissions.encode(column("transport_mode"), emissions.TRANSPORT_MODES),
+        electricity=column("electricity_kwh"),
+        cooking_fuel=emissions.encode(column("cooking_fuel"), emissions.COOKING_FUELS),
+        waste=np.column_stack([column(name) for name in WASTE_COLUMNS]),
+        meals_per_day=column("meals_per_day"),
+        diet=emissions.encode(column("diet"), emissions.DIET_TYPES),
+        flights=column("flights"),
+        fuel_consumption=column("fuel_kg"),
+    )
+    results = emissions.calculate_emissions(**inputs, region=rows, store=store)
+    scored = chunk.copy()
+    for category in emissions.CATEGORIES + ["total"]:
+        scored[f"{category}_kg"] = results[category]
+    tiers = np.array(emissions.CERTIFICATE_TIERS, dtype=object)
+    scored["certificate"] = tiers[emissions.certificate_tier(results["total"], rows, store)]
+    if samples:
+        bands = uncertainty.uncertainty_bands(emissions.activity_quantities(**inputs), rows, store, samples)
+        for category, values in bands.items():
+            for percentile, column_values in zip(uncertainty.DEFAULT_PERCENTILES, values.T):
+                scored[f"{category}_p{percentile}_kg"] = column_values
+    return scored
+
+
+def serialize_chunk(chunk: pd.DataFrame, parquet: bool):
+    """Encode a scored chunk for ChunkWriter.
+
+    Done separately from writing so process-pool workers can take the
+    formatting cost off the single writer process.
+    """
+    if parquet:
+        import pyarrow as pa
+
+        return pa.Table.from_pandas(chunk, preserve_index=False)
+    return chunk.to_csv(index=False, header=False)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file as they arrive."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = _is_parquet(path)
+        self._parquet_writer = None
+        self._csv_file = None
+
+    def write(self, chunk: pd.DataFrame):
+        self.write_serialized(list(chunk.columns), serialize_chunk(chunk, self.parquet))
+
+    def write_serialized(self, columns, payload):
+        if self.parquet:
+            import pyarrow.parquet as pq
+
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, payload.schema)
+            self._parquet_writer.write_table(payload)
+        else:
+            if self._csv_file is None:
+                self._csv_file = open(self.path, "w", newline="")
+                self._csv_file.write(pd.DataFrame(columns=columns).to_csv(index=False))
+            self._csv_file.write(payload)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if self._csv_file is not None:
+            self._csv_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# The factor store of a pool worker, set once by _init_worker
+_worker_store: Optional[factors.FactorStore] = None
+
+
+def _init_worker(source):
+    """Load the factor store once per worker process: from its file when it
+    has one (a memory-mapped store is then shared, not copied), otherwise
+    from the pickled store itself."""
+    global _worker_store
+    _worker_store = factors.FactorStore.load(source) if isinstance(source, str) else source
+
+
+def _score_shard(chunk: pd.DataFrame, region, store: Optional[factors.FactorStore], samples: int,
+                 parquet: bool):
+    scored = score_chunk(chunk, region, store or _worker_store, samples)
+    return list(scored.columns), serialize_chunk(scored, parquet)
+
+
+def _scored_shards(chunks, region, store: factors.FactorStore, samples: int, parquet: bool, workers: int):
+    """Yield (columns, payload) for each chunk, in input order.
+
+    With more than one worker, shards are scored in a process pool while
+    at most two per worker are in flight, which keeps memory bounded.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield _score_shard(chunk, region, store, samples, parquet)
+        return
+
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(store.path or store,)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_score_shard, chunk, region, None, samples, parquet))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def score_file(input_path: str, output_path: str, chunksize: int = DEFAULT_CHUNKSIZE,
+               region=emissions.DEFAULT_REGION, workers: int = 1,
+               store: Optional[factors.FactorStore] = None, samples: int = 0) -> int:
+    """Stream `input_path` through the engine into `output_path`, returning the row count."""
+    store = store or factors.DEFAULT_STORE
+    rows = 0
+
+    def counted(chunks):
+        nonlocal rows
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+
+    with ChunkWriter(output_path) as writer:
+        chunks = counted(read_chunks(input_path, chunksize))
+        for columns, payload in _scored_shards(chunks, region, store, samples, writer.parquet, workers):
+            writer.write_serialized(columns, payload)
+    return rows
+
+
+def benchmark(input_path: str, chunksize: int = DEFAULT_CHUNKSIZE,
+              region=emissions.DEFAULT_REGION, max_workers: int = 0,
+              store: Optional[factors.FactorStore] = None, samples: int = 0):
+    """Score `input_path` with 1, 2, 4, ... workers and print throughput and
+    speedup, checking that every run writes the same bytes as the serial one."""
+    import filecmp
+    import tempfile
+
+    max_workers = max_workers or os.cpu_count() or 1
+    worker_counts = []
+    workers = 1
+    while workers < max_workers:
+        worker_counts.append(workers)
+        workers *= 2
+    worker_counts.append(max_workers)
+
+    suffix = ".parquet" if _is_parquet(input_path) else ".csv"
+    baseline = None
+    print(f"{'workers':>7} {'seconds':>9} {'rows/sec':>12} {'speedup':>8} {'output':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        serial_path = os.path.join(tmp, "scores-1" + suffix)
+        for workers in worker_counts:
+            output_path = os.path.join(tmp, f"scores-{workers}" + suffix)
+            start = time.perf_counter()
+            rows = score_file(input_path, output_path, chunksize, region, workers, store, samples)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            identical = filecmp.cmp(serial_path, output_path, shallow=False)
+            print(f"{workers:>7} {elapsed:>9.2f} {rows / elapsed:>12,.0f} {baseline / elapsed:>7.2f}x "
+                  f"{'identical' if identical else 'DIFFERS':>9}")
+            if not identical:
+                raise ValueError(f"Output with {workers} workers differs from the serial output")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Score household carbon footprint profiles in bulk.")
+    parser.add_argument("input", help="CSV or Parquet file of household profiles")
+    parser.add_argument("output", nargs="?", help="CSV or Parquet file to write scores to")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help="rows scored per chunk (default: %(default)s)")
+    parser.add_argument("--factors", default=factors.DATA_PATH,
+                        help="emission factor store, JSON or binary (default: %(default)s)")
+    parser.add_argument("--region", default=emissions.DEFAULT_REGION,
+                        help="factor region for rows without a region column (default: %(default)s)")
+    parser.add_argument("--version", help="factor set version (default: latest per region)")
+    parser.add_argument("--samples", type=int, default=0,
+                        help="Monte Carlo factor samples for 5/50/95th percentile columns (default: off)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes to score shards in; 0 uses every core (default: %(default)s)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="report rows/sec and speedup for 1, 2, 4, ... up to --workers processes")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    workers = args.workers or os.cpu_count() or 1
+    region = (args.region, args.version) if args.version else args.region
+    try:
+        store = factors.FactorStore.load(args.factors)
+        store.resolve(region)
+        if args.benchmark:
+            benchmark(args.input, args.chunksize, region, workers, store, args.samples)
+            return
+        if args.output is None:
+            parser.error("the output file is required unless --benchmark is given")
+        start = time.perf_counter()
+        rows = score_file(args.input, args.output, args.chunksize, region, workers, store, args.samples)
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows:,} profiles in {elapsed:.2f}s with {workers} worker(s) "
+          f"({rows / max(elapsed, 1e-9):,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
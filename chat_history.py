@@ -0,0 +1,88 @@
+"""Compact, bounded chat history for the Chat tab.
+
+Assistant answers are mostly multi-kilobyte guides drawn from a small set,
+so each canonical answer (one the chatbot built from its knowledge base) is
+stored once per process in `ANSWERS`, keyed by its source, and a session's
+history keeps only its integer id. Any other answer text, such as a partial
+answer cut off by a timeout or generated text, stays inline in the session's
+history and goes when the session drops it. The history itself is a ring
+buffer of the last `HISTORY_SIZE` messages, and the Chat tab renders a
+window of the newest ones, so per-session memory and render time stay flat
+however long a conversation runs.
+"""
+import threading
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, Hashable, List, NamedTuple, Optional, Tuple, Union
+
+HISTORY_SIZE = 200
+PAGE_SIZE = 6
+
+
+class ChatMessage(NamedTuple):
+    is_user: bool
+    content: str
+
+
+class AnswerTable:
+    """Process-wide interning of canonical answer texts to small integer ids.
+
+    Answers are keyed by their source (see chatbot.RoutedResponse), a topic
+    or a few passages of the fixed knowledge base, so the table is bounded
+    by the knowledge base rather than by traffic.
+    """
+
+    def __init__(self):
+        self._ids: Dict[Tuple[Hashable, str], int] = {}
+        self._texts: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def intern(self, source: Hashable, text: str) -> int:
+        # Keyed by the text too, so an edited knowledge base never shows an
+        # answer from before the edit
+        key = (source, text)
+        with self._lock:
+            answer_id = self._ids.get(key)
+            if answer_id is None:
+                answer_id = self._ids[key] = len(self._texts)
+                self._texts.append(text)
+            return answer_id
+
+    def text(self, answer_id: int) -> str:
+        return self._texts[answer_id]
+
+
+ANSWERS = AnswerTable()
+
+
+class ChatHistory:
+    """The newest `maxlen` messages of one conversation; the oldest are
+    dropped as new ones arrive."""
+
+    def __init__(self, maxlen: int = HISTORY_SIZE, answers: AnswerTable = ANSWERS):
+        self.answers = answers
+        # (is_user, question or answer text, or an interned answer id)
+        self._entries: Deque[Tuple[bool, Union[str, int]]] = deque(maxlen=maxlen)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add_question(self, text: str):
+        self._entries.append((True, text))
+
+    def add_answer(self, text: str, source: Optional[Hashable] = None):
+        """Record an answer; pass the chatbot's `source` only when `text` is
+        exactly the canonical answer it built from that source."""
+        self._entries.append((False, text if source is None else self.answers.intern(source, text)))
+
+    def window(self, count: int) -> List[ChatMessage]:
+        """The newest `count` messages, oldest first."""
+        start = max(0, len(self._entries) - count)
+        return [ChatMessage(is_user, content if isinstance(content, str) else self.answers.text(content))
+                for is_user, content in islice(self._entries, start, None)]
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,215 @@
+"""Asynchronous chat service that streams answers to the Chat tab.
+
+Answer generation runs on the service's own asyncio event loop in a
+background thread, behind a pluggable `ChatBackend`. The Streamlit script
+only iterates a plain generator of text chunks (what `st.write_stream`
+expects), so a slow backend streams into the page instead of holding the
+script until the whole answer exists. Each session may run a limited number
+of answers at once, and every answer has an overall deadline.
+
+`python chat_service.py` checks all of this against FakeModelBackend.
+"""
+import asyncio
+import queue
+import re
+import threading
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterator, List
+
+from chatbot import CarbonFootprintChatbot
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_SESSION_CONCURRENCY = 1
+
+_DONE = object()
+
+
+class ChatTimeout(TimeoutError):
+    """The backend did not finish an answer before the deadline."""
+
+
+class ChatBackend(ABC):
+    @abstractmethod
+    def stream(self, question: str) -> AsyncIterator[str]:
+        """Yield the answer to `question` in chunks as they are produced."""
+
+
+class KeywordBackend(ChatBackend):
+    """The keyword/retrieval chatbot, streamed a paragraph at a time."""
+
+    def __init__(self, chatbot: CarbonFootprintChatbot):
+        self.chatbot = chatbot
+
+    async def stream(self, question: str) -> AsyncIterator[str]:
+        # Off the event loop, so heavier routing never stalls other answers
+        answer = await asyncio.to_thread(self.chatbot.get_response, question)
+        for paragraph in re.split(r"(?<=\n\n)", answer):
+            yield paragraph
+
+
+class FakeModelBackend(ChatBackend):
+    """Local stand-in for a generative model, for tests and load checks.
+
+    Answers with the chatbot's text, but only after `first_token_latency`
+    seconds and then one word every `token_latency` seconds, like a model
+    decoding tokens.
+    """
+
+    def __init__(self, chatbot: CarbonFootprintChatbot, first_token_latency: float = 0.5,
+                 token_latency: float = 0.02):
+        self.chatbot = chatbot
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+
+    async def stream(self, question: str) -> AsyncIterator[str]:
+        answer = await asyncio.to_thread(self.chatbot.get_response, question)
+        await asyncio.sleep(self.first_token_latency)
+        for token in re.findall(r"\S+\s*", answer):
+            yield token
+            await asyncio.sleep(self.token_latency)
+
+
+class ChatService:
+    def __init__(self, backend: ChatBackend, timeout: float = DEFAULT_TIMEOUT,
+                 session_concurrency: int = DEFAULT_SESSION_CONCURRENCY):
+        self.backend = backend
+        self.timeout = timeout
+        self.session_concurrency = session_concurrency
+        # session id -> [semaphore, answers waiting or running]; only
+        # touched from the event loop thread
+        self._slots: Dict[str, List] = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="chat-service", daemon=True)
+        self._thread.start()
+
+    def stream(self, session_id: str, question: str) -> Iterator[str]:
+        """Answer chunks for one question, for use from a Streamlit script.
+
+        Raises ChatTimeout (after the chunks produced so far) when the
+        answer misses its deadline. Closing the generator early, e.g. when
+        Streamlit interrupts the rerun, cancels the answer.
+        """
+        chunks: "queue.Queue" = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._produce(session_id, question, chunks), self._loop)
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is _DONE:
+                    return
+                if isinstance(chunk, BaseException):
+                    raise chunk
+                yield chunk
+        finally:
+            future.cancel()
+
+    def active_sessions(self) -> int:
+        return len(self._slots)
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    async def _produce(self, session_id: str, question: str, chunks: "queue.Queue"):
+        deadline = self._loop.time() + self.timeout
+        try:
+            async with self._session_slot(session_id, deadline):
+                answer = self.backend.stream(question)
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(answer.__anext__(), self._remaining(deadline))
+                        except StopAsyncIteration:
+                            break
+                        chunks.put(chunk)
+                finally:
+                    await answer.aclose()
+        except asyncio.TimeoutError:
+            chunks.put(ChatTimeout(f"No complete answer within {self.timeout:g} s"))
+        except Exception as error:
+            chunks.put(error)
+        finally:
+            chunks.put(_DONE)
+
+    @asynccontextmanager
+    async def _session_slot(self, session_id: str, deadline: float):
+        slot = self._slots.setdefault(session_id, [asyncio.Semaphore(self.session_concurrency), 0])
+        slot[1] += 1
+        try:
+            await asyncio.wait_for(slot[0].acquire(), self._remaining(deadline))
+            try:
+                yield
+            finally:
+                slot[0].release()
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                del self._slots[session_id]
+
+    def _remaining(self, deadline: float) -> float:
+        return max(0.0, deadline - self._loop.time())
+
+
+def check(question: str = "How can I save energy at home?"):
+    """Drive FakeModelBackend through streaming, the deadline, cancellation
+    and the per-session limit; raises AssertionError on a failure."""
+    import time
+
+    chatbot = CarbonFootprintChatbot()
+    expected = chatbot.get_response(question)
+
+    def expect(condition: bool, message: str):
+        if not condition:
+            raise AssertionError(message)
+
+    def timed_answer(service: "ChatService", session_id: str, times: Dict[str, float], name: str, start: float):
+        "".join(service.stream(session_id, question))
+        times[name] = time.perf_counter() - start
+
+    service = ChatService(FakeModelBackend(chatbot, first_token_latency=0.05, token_latency=0.001))
+    chunks = list(service.stream("a", question))
+    expect(len(chunks) > 1 and "".join(chunks) == expected, "streamed chunks do not rebuild the answer")
+    expect("".join(ChatService(KeywordBackend(chatbot)).stream("a", question)) == expected,
+           "keyword backend does not stream the answer")
+    print(f"streaming        ok: {len(chunks)} chunks")
+
+    service = ChatService(FakeModelBackend(chatbot, first_token_latency=0.5), timeout=0.2)
+    start = time.perf_counter()
+    try:
+        list(service.stream("a", question))
+        expect(False, "a 0.5 s first token met a 0.2 s deadline")
+    except ChatTimeout as error:
+        elapsed = time.perf_counter() - start
+        expect(elapsed < 0.45, f"timed out after {elapsed:.2f} s, not 0.2 s")
+        expect("0.2 s" in str(error), f"timeout message {str(error)!r} does not give the deadline")
+        print(f"timeout          ok: {elapsed:.2f} s, {error}")
+
+    service = ChatService(FakeModelBackend(chatbot, first_token_latency=0.0, token_latency=0.05))
+    stream = service.stream("a", question)
+    next(stream)
+    expect(service.active_sessions() == 1, "no session is active while answering")
+    stream.close()
+    deadline = time.perf_counter() + 1.0
+    while service.active_sessions() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    expect(service.active_sessions() == 0, "closing the stream did not cancel the answer")
+    print("cancel on close  ok")
+
+    service = ChatService(FakeModelBackend(chatbot, first_token_latency=0.3, token_latency=0.0))
+    times: Dict[str, float] = {}
+    start = time.perf_counter()
+    threads = [threading.Thread(target=timed_answer, args=(service, session_id, times, name, start))
+               for name, session_id in (("a1", "a"), ("a2", "a"), ("b", "b"))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    first, second = sorted((times["a1"], times["a2"]))
+    expect(second >= 2 * 0.3 and first < 2 * 0.3, "one session's answers were not run one at a time")
+    expect(times["b"] < 2 * 0.3, "another session waited for session a")
+    print(f"session limit    ok: same session {first:.2f} s and {second:.2f} s, "
+          f"other session {times['b']:.2f} s")
+
+
+if __name__ == "__main__":
+    check()
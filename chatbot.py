@@ -1,240 +1,482 @@
-import streamlit as st
-from typing import Dict, List
+import hashlib
+import logging
+import re
+import unicodedata
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+from fuzzy import SpellingIndex
+from keyword_matcher import KeywordMatcher
+from response_cache import DEFAULT_MAXSIZE, ResponseCache
+from retrieval import STOP_WORDS, PassageIndex, split_passages, tokenize
+
+if TYPE_CHECKING:
+    from intent_model import IntentModel
+
+logger = logging.getLogger(__name__)
+
+# Knowledge tables are built once per process and frozen, so one chatbot can
+# be shared by every session and thread.
+RESPONSES = MappingProxyType({
+    'greeting': (
+        "👋 Hello! I'm your Eco-Friendly Assistant. I can help you:\n\n"
+        "1. 📊 Calculate your carbon footprint\n"
+        "2. 🌱 Get personalized eco-tips\n"
+        "3. 🚗 Learn about sustainable transportation\n"
+        "4. 💡 Discover energy-saving solutions\n"
+        "5. 🍽️ Explore sustainable diet options\n\n"
+        "What would you like to know?",
+    ),
+    'carbon_footprint_definition': (
+        "🌍 Understanding Your Carbon Footprint:\n\n"
+        "Your carbon footprint is the total greenhouse gases (mainly CO2) you emit annually. Here's what contributes to it:\n\n"
+        "1. 🚗 Transportation (25%)\n"
+        "   • Cars, buses, flights\n"
+        "   • Daily commute\n"
+        "   • Travel choices\n\n"
+        "2. 💡 Energy (30%)\n"
+        "   • Electricity usage\n"
+        "   • Heating/cooling\n"
+        "   • Appliance efficiency\n\n"
+        "3. 🍽️ Diet (20%)\n"
+        "   • Food choices\n"
+        "   • Meat consumption\n"
+        "   • Food waste\n\n"
+        "4. 🗑️ Waste (10%)\n"
+        "   • Recycling habits\n"
+        "   • Waste management\n"
+        "   • Product choices\n\n"
+        "5. 💧 Water (10%)\n"
+        "   • Water usage\n"
+        "   • Hot water heating\n"
+        "   • Water conservation\n\n"
+        "6. 🛍️ Shopping (5%)\n"
+        "   • Consumer choices\n"
+        "   • Product lifecycle\n"
+        "   • Sustainable shopping\n\n"
+        "📊 Current Averages:\n"
+        "• Global: 4.79 tonnes CO2/person/year\n"
+        "• India: 1.9 tonnes CO2/person/year\n\n"
+        "Would you like to calculate your carbon footprint or learn more about any specific category?",
+    ),
+    'transportation': (
+        "🚗 Sustainable Transportation Guide:\n\n"
+        "1. 🚌 Public Transport Options:\n"
+        "   • Bus: 0.1 kgCO2/km\n"
+        "   • Train: 0.05 kgCO2/km\n"
+        "   • Metro: 0.03 kgCO2/km\n\n"
+        "2. 🚗 Private Vehicles:\n"
+        "   • Car: 0.2 kgCO2/km\n"
+        "   • Motorcycle: 0.1 kgCO2/km\n"
+        "   • Electric Vehicle: 0.05 kgCO2/km\n\n"
+        "3. ✈️ Air Travel:\n"
+        "   • Domestic: 0.2 kgCO2/km\n"
+        "   • International: 0.25 kgCO2/km\n\n"
+        "🌱 Eco-Friendly Tips:\n"
+        "1. Short-term actions:\n"
+        "   • Use public transport\n"
+        "   • Carpool with colleagues\n"
+        "   • Walk or cycle for short distances\n\n"
+        "2. Long-term actions:\n"
+        "   • Switch to electric vehicles\n"
+        "   • Move closer to work\n"
+        "   • Work from home when possible\n\n"
+        "Would you like to calculate your transportation emissions or get more specific tips?",
+    ),
+    'energy': (
+        "💡 Energy Conservation Guide:\n\n"
+        "1. 🏠 Home Energy:\n"
+        "   • Grid power: 0.82 kgCO2/kWh\n"
+        "   • Solar power: 0.05 kgCO2/kWh\n"
+        "   • Wind power: 0.02 kgCO2/kWh\n\n"
+        "2. 🔥 Cooking:\n"
+        "   • LPG: 2.1 kgCO2/kg\n"
+        "   • CNG: 2.2 kgCO2/kg\n"
+        "   • Electric: 0.82 kgCO2/kWh\n\n"
+        "🌱 Energy-Saving Tips:\n"
+        "1. Lighting:\n"
+        "   • Use LED bulbs (saves 80% energy)\n"
+        "   • Use natural light when possible\n"
+        "   • Install motion sensors\n\n"
+        "2. Appliances:\n"
+        "   • Choose 5-star rated appliances\n"
+        "   • Regular maintenance\n"
+        "   • Use power-saving mode\n\n"
+        "3. Heating/Cooling:\n"
+        "   • Set optimal temperature\n"
+        "   • Use ceiling fans\n"
+        "   • Insulate your home\n\n"
+        "Would you like to calculate your energy emissions or get more specific tips?",
+    ),
+    'diet': (
+        "🍽️ Sustainable Diet Guide:\n\n"
+        "1. 🥬 Food Types:\n"
+        "   • Vegan: 0.3 kgCO2/meal\n"
+        "   • Vegetarian: 0.5 kgCO2/meal\n"
+        "   • Non-vegetarian: 1.5 kgCO2/meal\n\n"
+        "2. 🌾 Food Production:\n"
+        "   • Local produce: Lower emissions\n"
+        "   • Imported food: Higher emissions\n"
+        "   • Organic farming: Lower emissions\n\n"
+        "🌱 Sustainable Eating Tips:\n"
+        "1. Food choices:\n"
+        "   • Eat more plant-based foods\n"
+        "   • Choose local produce\n"
+        "   • Reduce processed foods\n\n"
+        "2. Shopping habits:\n"
+        "   • Buy in bulk\n"
+        "   • Use reusable bags\n"
+        "   • Plan meals to reduce waste\n\n"
+        "3. Storage:\n"
+        "   • Proper refrigeration\n"
+        "   • Use airtight containers\n"
+        "   • Regular cleaning\n\n"
+        "Would you like to calculate your diet-related emissions or get more specific tips?",
+    ),
+    'waste': (
+        "🗑️ Waste Management Guide:\n\n"
+        "1. 🗑️ Waste Types:\n"
+        "   • Organic: 0.1 kgCO2/kg\n"
+        "   • Plastic: 0.5 kgCO2/kg\n"
+        "   • Paper: 0.3 kgCO2/kg\n"
+        "   • Metal: 0.8 kgCO2/kg\n\n"
+        "2. ♻️ Management Methods:\n"
+        "   • Recycling: Lowest emissions\n"
+        "   • Composting: Low emissions\n"
+        "   • Landfill: Highest emissions\n\n"
+        "🌱 Waste Reduction Tips:\n"
+        "1. Reduce:\n"
+        "   • Buy only what you need\n"
+        "   • Choose products with less packaging\n"
+        "   • Use reusable items\n\n"
+        "2. Reuse:\n"
+        "   • Repair items\n"
+        "   • Donate unused items\n"
+        "   • Use refillable containers\n\n"
+        "3. Recycle:\n"
+        "   • Separate waste properly\n"
+        "   • Use recycling bins\n"
+        "   • Support recycling programs\n\n"
+        "Would you like to calculate your waste-related emissions or get more specific tips?",
+    ),
+    'water': (
+        "💧 Water Conservation Guide:\n\n"
+        "1. 💧 Water Usage:\n"
+        "   • Drinking water: 0.344 kgCO2/m³\n"
+        "   • Hot water: Additional emissions\n"
+        "   • Wastewater treatment: 0.5 kgCO2/m³\n\n"
+        "2. 🌱 Conservation Tips:\n"
+        "   • Fix leaking taps\n"
+        "   • Use water-efficient fixtures\n"
+        "   • Collect rainwater\n"
+        "   • Reuse greywater\n\n"
+        "3. 🏠 Room-specific tips:\n"
+        "   • Bathroom: Low-flow fixtures, shorter showers\n"
+        "   • Kitchen: Efficient dishwashing, fix leaks\n"
+        "   • Laundry: Full loads, cold water\n\n"
+        "Would you like to calculate your water-related emissions or get more specific tips?",
+    ),
+    'shopping': (
+        "🛍️ Sustainable Shopping Guide:\n\n"
+        "1. 🛍️ Common Items:\n"
+        "   • Clothing: 2.5 kgCO2/item\n"
+        "   • Electronics: 15.0 kgCO2/item\n"
+        "   • Furniture: 20.0 kgCO2/item\n\n"
+        "2. 🌱 Sustainable Shopping:\n"
+        "   • Buy second-hand\n"
+        "   • Choose durable items\n"
+        "   • Support local businesses\n"
+        "   • Avoid fast fashion\n\n"
+        "3. 💡 Smart Shopping Tips:\n"
+        "   • Before buying: Need vs. want\n"
+        "   • While shopping: Eco-friendly products\n"
+        "   • After purchase: Proper maintenance\n\n"
+        "Would you like to calculate your shopping-related emissions or get more specific tips?",
+    ),
+    'default': (
+        "🌍 I'm here to help you understand your environmental impact. Here are some topics I can help with:\n\n"
+        "1. 📊 Carbon Footprint Calculation\n"
+        "2. 🚗 Sustainable Transportation\n"
+        "3. 💡 Energy Conservation\n"
+        "4. 🍽️ Sustainable Diet\n"
+        "5. 🗑️ Waste Management\n"
+        "6. 💧 Water Conservation\n"
+        "7. 🛍️ Sustainable Shopping\n\n"
+        "What would you like to learn more about?",
+    ),
+})
+
+KEYWORDS = MappingProxyType({
+    'greeting': ('hi', 'hello', 'hey', 'greetings', 'help', 'start'),
+    'carbon_footprint_definition': ('what is carbon footprint', 'define carbon footprint', 'explain carbon footprint', 'carbon footprint meaning', 'carbon footprint definition', 'calculate carbon footprint', 'calculate my carbon footprint'),
+    'transportation': ('car', 'cars', 'bus', 'buses', 'train', 'transport', 'drive', 'driving', 'commute', 'commuting', 'vehicle', 'travel', 'travelling', 'flight'),
+    'energy': ('power', 'energy', 'electric', 'light', 'bulb', 'appliance', 'power consumption', 'electricity', 'lpg', 'cng'),
+    'diet': ('food', 'eat', 'eating', 'diet', 'meal', 'vegetarian', 'vegan', 'meat', 'produce', 'cooking'),
+    'waste': ('waste', 'garbage', 'trash', 'recycle', 'recycling', 'reuse', 'reusing', 'disposal', 'landfill', 'compost'),
+    'water': ('water', 'shower', 'bath', 'tap', 'taps', 'faucet', 'laundry', 'washing'),
+    'shopping': ('shop', 'shopping', 'buy', 'buying', 'purchase', 'clothes', 'electronics', 'furniture', 'items')
+})
+
+# Topics that win whenever they are mentioned, in this order
+PRIORITY_TOPICS = ('greeting', 'carbon_footprint_definition')
+
+MATCHER = KeywordMatcher(KEYWORDS)
+
+# Keyword vocabulary for correcting typos ("elecricity", "recyle")
+SPELLING = SpellingIndex({word for words in KEYWORDS.values() for phrase in words
+                          for word in phrase.split()})
+
+# Words outside the vocabulary recur ("question", "please"), so their
+# corrections are memoized
+@lru_cache(maxsize=4096)
+def correct_word(word: str) -> str:
+    return SPELLING.correct(word)
+
+# Retrieval mode answers with the best passages of the knowledge base; the
+# greeting and the menu are not knowledge
+PASSAGE_INDEX = PassageIndex(split_passages(RESPONSES, exclude=('greeting', 'default')))
+RETRIEVAL_TOP_K = 2
+# BM25 score per query term a passage needs to answer a question no topic
+# matched; below it the default reply answers instead. Questions routed to
+# a topic are answered from that topic's best passages.
+RETRIEVAL_TERM_THRESHOLD = 2.0
+
+MODES = ('keywords', 'retrieval')
+
+@lru_cache(maxsize=1)
+def trained_intent_model() -> Optional["IntentModel"]:
+    """The intent model trained from intent_queries.tsv (see intent_model.py),
+    loaded on first use so importing the chatbot stays free of NumPy; a
+    missing model file is trained and saved then. None routes messages by
+    keywords: there is nothing to train from, or the model cannot be read."""
+    try:
+        import intent_model
+        model = intent_model.load_default()
+    except Exception:
+        logger.warning("Could not load the intent model; routing by keywords", exc_info=True)
+        return None
+    if model is None:
+        logger.warning("No intent model or training queries; routing by keywords")
+    return model
+
+# Marks a chatbot that uses trained_intent_model() once it first classifies
+_TRAINED_MODEL = object()
+
+# Cached answers are tied to this digest of the tables (and to the intent
+# model's digest), so editing them (e.g. a module reload) empties the
+# response cache
+KNOWLEDGE_VERSION = hashlib.sha1(repr((dict(RESPONSES), dict(KEYWORDS))).encode('utf-8')).hexdigest()
+
+# Stop words dropped from normalized queries; words the keyword tables use
+# ("what is carbon footprint") are kept so routing sees the same phrases
+QUERY_STOP_WORDS = STOP_WORDS - SPELLING.words
+_QUERY_WORD = re.compile(r"[a-z0-9]+")
+
+def query_words(text: str) -> List[str]:
+    """Case-folded words of `text`, split at punctuation, symbols and spaces.
+
+    Letters, digits and combining marks of any script are word characters;
+    plain `\\w` would split "बिजली" at its vowel signs.
+    """
+    text = text.casefold()
+    if text.isascii():
+        return _QUERY_WORD.findall(text)
+    return "".join(char if unicodedata.category(char)[0] in "LMN" else " " for char in text).split()
+
+def normalize_query(text: str) -> str:
+    """Case-folded words of `text` without punctuation or stop words."""
+    return " ".join(word for word in query_words(text) if word not in QUERY_STOP_WORDS)
+
+SUGGESTIONS = (
+    "What is carbon footprint?",
+    "How can I reduce my transportation emissions?",
+    "What are some energy-saving tips?",
+    "How can I make my diet more sustainable?",
+    "What are some waste reduction tips?",
+    "How can I save water?",
+    "What are sustainable shopping tips?",
+    "How do I calculate my carbon footprint?",
+)
+
+# Queries get_responses routes together; each distinct one is routed once
+BATCH_MEMO_SIZE = 100_000
+
+class RoutedResponse(NamedTuple):
+    """An answer, the topic it came from and how strongly the query matched:
+    the intent model's probability or keyword hits for that topic, or the
+    BM25 score of the best passage. `source` names the knowledge the text
+    was built from (the topic's article, or the passages retrieved), so
+    equal sources mean equal texts."""
+    topic: str
+    score: float
+    text: str
+    source: Hashable = None
 
 class CarbonFootprintChatbot:
-    def __init__(self):
-        self.responses = {
-            'greeting': [
-                "👋 Hello! I'm your Eco-Friendly Assistant. I can help you:\n\n"
-                "1. 📊 Calculate your carbon footprint\n"
-                "2. 🌱 Get personalized eco-tips\n"
-                "3. 🚗 Learn about sustainable transportation\n"
-                "4. 💡 Discover energy-saving solutions\n"
-                "5. 🍽️ Explore sustainable diet options\n\n"
-                "What would you like to know?"
-            ],
-            'carbon_footprint_definition': [
-                "🌍 Understanding Your Carbon Footprint:\n\n"
-                "Your carbon footprint is the total greenhouse gases (mainly CO2) you emit annually. Here's what contributes to it:\n\n"
-                "1. 🚗 Transportation (25%)\n"
-                "   • Cars, buses, flights\n"
-                "   • Daily commute\n"
-                "   • Travel choices\n\n"
-                "2. 💡 Energy (30%)\n"
-                "   • Electricity usage\n"
-                "   • Heating/cooling\n"
-                "   • Appliance efficiency\n\n"
-                "3. 🍽️ Diet (20%)\n"
-                "   • Food choices\n"
-                "   • Meat consumption\n"
-                "   • Food waste\n\n"
-                "4. 🗑️ Waste (10%)\n"
-                "   • Recycling habits\n"
-                "   • Waste management\n"
-                "   • Product choices\n\n"
-                "5. 💧 Water (10%)\n"
-                "   • Water usage\n"
-                "   • Hot water heating\n"
-                "   • Water conservation\n\n"
-                "6. 🛍️ Shopping (5%)\n"
-                "   • Consumer choices\n"
-                "   • Product lifecycle\n"
-                "   • Sustainable shopping\n\n"
-                "📊 Current Averages:\n"
-                "• Global: 4.79 tonnes CO2/person/year\n"
-                "• India: 1.9 tonnes CO2/person/year\n\n"
-                "Would you like to calculate your carbon footprint or learn more about any specific category?"
-            ],
-            'transportation': [
-                "🚗 Sustainable Transportation Guide:\n\n"
-                "1. 🚌 Public Transport Options:\n"
-                "   • Bus: 0.1 kgCO2/km\n"
-                "   • Train: 0.05 kgCO2/km\n"
-                "   • Metro: 0.03 kgCO2/km\n\n"
-                "2. 🚗 Private Vehicles:\n"
-                "   • Car: 0.2 kgCO2/km\n"
-                "   • Motorcycle: 0.1 kgCO2/km\n"
-                "   • Electric Vehicle: 0.05 kgCO2/km\n\n"
-                "3. ✈️ Air Travel:\n"
-                "   • Domestic: 0.2 kgCO2/km\n"
-                "   • International: 0.25 kgCO2/km\n\n"
-                "🌱 Eco-Friendly Tips:\n"
-                "1. Short-term actions:\n"
-                "   • Use public transport\n"
-                "   • Carpool with colleagues\n"
-                "   • Walk or cycle for short distances\n\n"
-                "2. Long-term actions:\n"
-                "   • Switch to electric vehicles\n"
-                "   • Move closer to work\n"
-                "   • Work from home when possible\n\n"
-                "Would you like to calculate your transportation emissions or get more specific tips?"
-            ],
-            'energy': [
-                "💡 Energy Conservation Guide:\n\n"
-                "1. 🏠 Home Energy:\n"
-                "   • Grid power: 0.82 kgCO2/kWh\n"
-                "   • Solar power: 0.05 kgCO2/kWh\n"
-                "   • Wind power: 0.02 kgCO2/kWh\n\n"
-                "2. 🔥 Cooking:\n"
-                "   • LPG: 2.1 kgCO2/kg\n"
-                "   • CNG: 2.2 kgCO2/kg\n"
-                "   • Electric: 0.82 kgCO2/kWh\n\n"
-                "🌱 Energy-Saving Tips:\n"
-                "1. Lighting:\n"
-                "   • Use LED bulbs (saves 80% energy)\n"
-                "   • Use natural light when possible\n"
-                "   • Install motion sensors\n\n"
-                "2. Appliances:\n"
-                "   • Choose 5-star rated appliances\n"
-                "   • Regular maintenance\n"
-                "   • Use power-saving mode\n\n"
-                "3. Heating/Cooling:\n"
-                "   • Set optimal temperature\n"
-                "   • Use ceiling fans\n"
-                "   • Insulate your home\n\n"
-                "Would you like to calculate your energy emissions or get more specific tips?"
-            ],
-            'diet': [
-                "🍽️ Sustainable Diet Guide:\n\n"
-                "1. 🥬 Food Types:\n"
-                "   • Vegan: 0.3 kgCO2/meal\n"
-                "   • Vegetarian: 0.5 kgCO2/meal\n"
-                "   • Non-vegetarian: 1.5 kgCO2/meal\n\n"
-                "2. 🌾 Food Production:\n"
-                "   • Local produce: Lower emissions\n"
-                "   • Imported food: Higher emissions\n"
-                "   • Organic farming: Lower emissions\n\n"
-                "🌱 Sustainable Eating Tips:\n"
-                "1. Food choices:\n"
-                "   • Eat more plant-based foods\n"
-                "   • Choose local produce\n"
-                "   • Reduce processed foods\n\n"
-                "2. Shopping habits:\n"
-                "   • Buy in bulk\n"
-                "   • Use reusable bags\n"
-                "   • Plan meals to reduce waste\n\n"
-                "3. Storage:\n"
-                "   • Proper refrigeration\n"
-                "   • Use airtight containers\n"
-                "   • Regular cleaning\n\n"
-                "Would you like to calculate your diet-related emissions or get more specific tips?"
-            ],
-            'waste': [
-                "🗑️ Waste Management Guide:\n\n"
-                "1. 🗑️ Waste Types:\n"
-                "   • Organic: 0.1 kgCO2/kg\n"
-                "   • Plastic: 0.5 kgCO2/kg\n"
-                "   • Paper: 0.3 kgCO2/kg\n"
-                "   • Metal: 0.8 kgCO2/kg\n\n"
-                "2. ♻️ Management Methods:\n"
-                "   • Recycling: Lowest emissions\n"
-                "   • Composting: Low emissions\n"
-                "   • Landfill: Highest emissions\n\n"
-                "🌱 Waste Reduction Tips:\n"
-                "1. Reduce:\n"
-                "   • Buy only what you need\n"
-                "   • Choose products with less packaging\n"
-                "   • Use reusable items\n\n"
-                "2. Reuse:\n"
-                "   • Repair items\n"
-                "   • Donate unused items\n"
-                "   • Use refillable containers\n\n"
-                "3. Recycle:\n"
-                "   • Separate waste properly\n"
-                "   • Use recycling bins\n"
-                "   • Support recycling programs\n\n"
-                "Would you like to calculate your waste-related emissions or get more specific tips?"
-            ],
-            'water': [
-                "💧 Water Conservation Guide:\n\n"
-                "1. 💧 Water Usage:\n"
-                "   • Drinking water: 0.344 kgCO2/m³\n"
-                "   • Hot water: Additional emissions\n"
-                "   • Wastewater treatment: 0.5 kgCO2/m³\n\n"
-                "2. 🌱 Conservation Tips:\n"
-                "   • Fix leaking taps\n"
-                "   • Use water-efficient fixtures\n"
-                "   • Collect rainwater\n"
-                "   • Reuse greywater\n\n"
-                "3. 🏠 Room-specific tips:\n"
-                "   • Bathroom: Low-flow fixtures, shorter showers\n"
-                "   • Kitchen: Efficient dishwashing, fix leaks\n"
-                "   • Laundry: Full loads, cold water\n\n"
-                "Would you like to calculate your water-related emissions or get more specific tips?"
-            ],
-            'shopping': [
-                "🛍️ Sustainable Shopping Guide:\n\n"
-                "1. 🛍️ Common Items:\n"
-                "   • Clothing: 2.5 kgCO2/item\n"
-                "   • Electronics: 15.0 kgCO2/item\n"
-                "   • Furniture: 20.0 kgCO2/item\n\n"
-                "2. 🌱 Sustainable Shopping:\n"
-                "   • Buy second-hand\n"
-                "   • Choose durable items\n"
-                "   • Support local businesses\n"
-                "   • Avoid fast fashion\n\n"
-                "3. 💡 Smart Shopping Tips:\n"
-                "   • Before buying: Need vs. want\n"
-                "   • While shopping: Eco-friendly products\n"
-                "   • After purchase: Proper maintenance\n\n"
-                "Would you like to calculate your shopping-related emissions or get more specific tips?"
-            ],
-            'default': [
-                "🌍 I'm here to help you understand your environmental impact. Here are some topics I can help with:\n\n"
-                "1. 📊 Carbon Footprint Calculation\n"
-                "2. 🚗 Sustainable Transportation\n"
-                "3. 💡 Energy Conservation\n"
-                "4. 🍽️ Sustainable Diet\n"
-                "5. 🗑️ Waste Management\n"
-                "6. 💧 Water Conservation\n"
-                "7. 🛍️ Sustainable Shopping\n\n"
-                "What would you like to learn more about?"
-            ]
-        }
-
-        self.keywords = {
-            'greeting': ['hi', 'hello', 'hey', 'greetings', 'help', 'start'],
-            'carbon_footprint_definition': ['what is carbon footprint', 'define carbon footprint', 'explain carbon footprint', 'carbon footprint meaning', 'carbon footprint definition'],
-            'transportation': ['car', 'bus', 'train', 'transport', 'drive', 'commute', 'vehicle', 'travel', 'flight'],
-            'energy': ['power', 'energy', 'electric', 'light', 'bulb', 'appliance', 'power consumption', 'electricity', 'lpg', 'cng'],
-            'diet': ['food', 'eat', 'diet', 'meal', 'vegetarian', 'vegan', 'meat', 'produce', 'cooking'],
-            'waste': ['waste', 'garbage', 'trash', 'recycle', 'reuse', 'disposal', 'landfill', 'compost'],
-            'water': ['water', 'shower', 'bath', 'tap', 'faucet', 'laundry', 'washing'],
-            'shopping': ['shop', 'buy', 'purchase', 'clothes', 'electronics', 'furniture', 'items']
-        }
+    def __init__(self, mode: str = 'keywords', cache_size: int = DEFAULT_MAXSIZE,
+                 intent_model: Optional["IntentModel"] = _TRAINED_MODEL):
+        if mode not in MODES:
+            raise ValueError(f"Unknown chatbot mode {mode!r}, expected one of {MODES}")
+        self.mode = mode
+        self.responses = RESPONSES
+        self.keywords = KEYWORDS
+        self._intent_model = intent_model
+        self.cache = ResponseCache(cache_size)
+
+    @property
+    def intent_model(self) -> Optional["IntentModel"]:
+        if self._intent_model is _TRAINED_MODEL:
+            self._intent_model = trained_intent_model()
+        return self._intent_model
+
+    @property
+    def knowledge_version(self) -> Tuple[str, Optional[str]]:
+        model = self.intent_model
+        return KNOWLEDGE_VERSION, model.digest if model is not None else None
+
+    def classify(self, user_input: str) -> Optional[Tuple[str, float]]:
+        """(topic, score) of a message, or None when nothing matches; see
+        RoutedResponse for the score."""
+        model = self.intent_model
+        if model is not None:
+            return model.classify(self._correct_unknown(user_input))
+
+        # One pass over the message finds every topic's whole-word keywords
+        match = MATCHER.classify(user_input, PRIORITY_TOPICS)
+        if match is None:
+            # Nothing matched as typed; retry with misspelled keywords corrected
+            match = MATCHER.classify(SPELLING.correct(user_input), PRIORITY_TOPICS)
+        return match
+
+    def _classify_batch(self, queries: List[str]) -> List[Optional[Tuple[str, float]]]:
+        """`classify` for many queries, scored together by the intent model."""
+        model = self.intent_model
+        if model is None:
+            return [self.classify(user_input) for user_input in queries]
+        return model.classify_batch([self._correct_unknown(query) for query in queries])
+
+    def _correct_unknown(self, query: str) -> str:
+        """`query` with words the intent model never saw spell-corrected
+        ("elecricity" -> "electricity"); known words are left alone."""
+        model = self.intent_model
+        return " ".join(word if model.knows(word) else correct_word(word) for word in query.split())
+
+    def get_topic(self, user_input: str) -> Optional[str]:
+        """Topic of a message, or None when nothing matches."""
+        match = self.classify(user_input)
+        return match[0] if match else None
 
     def get_response(self, user_input: str) -> str:
-        user_input = user_input.lower().strip()
-        
-        # Check for greetings
-        if any(word in user_input for word in self.keywords['greeting']):
-            return self.responses['greeting'][0]
-        
-        # Check for carbon footprint definition first
-        if any(phrase in user_input for phrase in self.keywords['carbon_footprint_definition']):
-            return self.responses['carbon_footprint_definition'][0]
+        return self.route(user_input).text
+
+    def route(self, user_input: str) -> RoutedResponse:
+        """The answer to a message, with where it came from."""
+        # Answers are computed from the normalized query, so every phrasing
+        # that shares a cache key also shares the answer
+        query = normalize_query(user_input)
+        return self.cache.get_or_compute(query, lambda: self._route(query), self.knowledge_version)
+
+    def get_responses(self, queries: Iterable[str]) -> List[RoutedResponse]:
+        """Route many queries in one call, e.g. to replay logged questions.
+
+        Queries are classified together, BATCH_MEMO_SIZE at a time, and each
+        distinct normalized query in such a batch is routed once. The shared
+        response cache is left alone, so a replay does not evict the answers
+        live sessions are using.
+        """
+        results: List[RoutedResponse] = []
+        batch: List[str] = []
+        for user_input in queries:
+            batch.append(normalize_query(user_input))
+            if len(batch) >= BATCH_MEMO_SIZE:
+                results.extend(self._route_batch(batch))
+                batch = []
+        results.extend(self._route_batch(batch))
+        return results
+
+    def _route_batch(self, queries: List[str]) -> List[RoutedResponse]:
+        distinct = list(dict.fromkeys(queries))
+        routed = dict(zip(distinct, map(self._respond, distinct, self._classify_batch(distinct))))
+        return [routed[query] for query in queries]
+
+    def _route(self, user_input: str) -> RoutedResponse:
+        return self._respond(user_input, self.classify(user_input))
+
+    def _respond(self, user_input: str, match: Optional[Tuple[str, float]]) -> RoutedResponse:
+        topic, score = match if match else ('default', 0)
         
-        # Check for specific topics
-        for topic, keywords in self.keywords.items():
-            if topic not in ['greeting', 'carbon_footprint_definition']:
-                if any(word in user_input for word in keywords):
-                    return self.responses[topic][0]
+        if self.mode == 'retrieval' and topic not in PRIORITY_TOPICS:
+            if match:
+                passages = PASSAGE_INDEX.search(user_input, RETRIEVAL_TOP_K, topic)
+            else:
+                threshold = RETRIEVAL_TERM_THRESHOLD * len(set(tokenize(user_input)))
+                passages = [hit for hit in PASSAGE_INDEX.search(user_input, RETRIEVAL_TOP_K)
+                            if hit.score >= threshold]
+            if passages:
+                return RoutedResponse(passages[0].passage.topic, passages[0].score,
+                                      "\n\n".join(hit.passage.text for hit in passages),
+                                      tuple(hit.passage for hit in passages))
         
         # For random questions, provide a helpful default response
-        return self.responses['default'][0]
+        return RoutedResponse(topic, float(score), self.responses[topic][0], topic)
 
     def get_suggestions(self) -> List[str]:
         """Return a list of suggested questions for the user."""
-        return [
-            "What is carbon footprint?",
-            "How can I reduce my transportation emissions?",
-            "What are some energy-saving tips?",
-            "How can I make my diet more sustainable?",
-            "What are some waste reduction tips?",
-            "How can I save water?",
-            "What are sustainable shopping tips?",
-            "How do I calculate my carbon footprint?"
-        ]
+        return list(SUGGESTIONS)
 
     def get_paper_bgcolor(self):
-        return 'rgba(0,1,0,0)' if st.session_state.dark_mode else 'white' 
\ No newline at end of file
+        import streamlit as st
+        return 'rgba(0,1,0,0)' if st.session_state.dark_mode else 'white' 
+
+
+def benchmark_batch(queries: int = 200_000, seed: int = 0):
+    """Throughput of get_responses against one uncached call per query on a
+    synthetic log: suggestions, rephrasings, typos and a long unique tail."""
+    import random
+    import time
+
+    rng = random.Random(seed)
+    words = sorted({word for phrases in KEYWORDS.values() for phrase in phrases for word in phrase.split()})
+    templates = ["{}", "{}?", "  {} please", "Tell me: {}"]
+    log = []
+    for i in range(queries):
+        if rng.random() < 0.7:
+            text = rng.choice(SUGGESTIONS)
+        else:
+            text = f"question {i} about {rng.choice(words)}"
+        log.append(rng.choice(templates).format(text))
+
+    for mode in MODES:
+        bot = CarbonFootprintChatbot(mode)
+        start = time.perf_counter()
+        for user_input in log:
+            bot._route(user_input)
+        single = time.perf_counter() - start
+        start = time.perf_counter()
+        bot.get_responses(log)
+        batch = time.perf_counter() - start
+        print(f"{mode:10s} one call per query: {len(log) / single:9.0f} queries/s, "
+              f"get_responses: {len(log) / batch:9.0f} queries/s")
+
+
+def check_modes():
+    """Raise AssertionError unless retrieval mode answers every suggestion
+    from the topic keyword mode routes it to, and answers small talk with
+    the default reply."""
+    keywords, retrieval = CarbonFootprintChatbot('keywords'), CarbonFootprintChatbot('retrieval')
+    wrong = [question for question in SUGGESTIONS
+             if retrieval.route(question).topic != keywords.route(question).topic]
+    if wrong:
+        raise AssertionError(f"Retrieval mode routes suggestions to other topics: {wrong}")
+    small_talk = ["what's up", "who's the president", "it's a nice day"]
+    wrong = [question for question in small_talk
+             if keywords.route(question).topic == 'default' != retrieval.route(question).topic]
+    if wrong:
+        raise AssertionError(f"Retrieval mode answers small talk from the knowledge base: {wrong}")
+    print(f"retrieval mode matches keyword topics on {len(SUGGESTIONS)} suggestions")
+
+
+if __name__ == "__main__":
+    check_modes()
+    benchmark_batch()
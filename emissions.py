@@ -0,0 +1,169 @@
+"""Vectorized emission engine shared by the Streamlit app and batch tools.
+
+Every function takes columnar inputs (scalars or NumPy arrays of length N)
+and returns annual kg CO2e per profile, so the Calculate tab can score one
+household with N=1 and batch jobs can score millions in a single pass.
+"""
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+import factors
+
+DEFAULT_REGION = factors.DEFAULT_REGION
+
+# Integer codes are positions in these lists, matching the selectbox options
+TRANSPORT_MODES = ["Car", "Bus", "Train", "Motorcycle", "Airplane"]
+COOKING_FUELS = ["LPG", "CNG", "Electric"]
+DIET_TYPES = ["Vegan", "Vegetarian", "Non-vegetarian"]
+WASTE_TYPES = ["Organic", "Plastic", "Paper", "Metal"]
+CATEGORIES = ["transport", "energy", "waste", "diet"]
+
+# Option code -> activity code in the factor store matrix
+TRANSPORT_CODES = factors.activity_codes(TRANSPORT_MODES)
+FUEL_CODES = factors.activity_codes(COOKING_FUELS)
+DIET_CODES = factors.activity_codes(DIET_TYPES)
+WASTE_CODES = factors.activity_codes(WASTE_TYPES)
+ELECTRICITY = factors.ACTIVITY_CODES["Electricity"]
+
+# Activities whose factors feed each category
+CATEGORY_ACTIVITIES = {
+    "transport": TRANSPORT_CODES,
+    "energy": np.concatenate([[ELECTRICITY], FUEL_CODES]),
+    "waste": WASTE_CODES,
+    "diet": DIET_CODES,
+}
+
+AIRPLANE = TRANSPORT_MODES.index("Airplane")
+KM_PER_FLIGHT = 1000
+
+# Certificate thresholds in t CO2e per year; Eco Warrior and Climate
+# Champion use the global and national averages of the region's factor set
+EARTH_GUARDIAN_LIMIT = 1.0
+CERTIFICATE_TIERS = ["Green Novice", "Eco Warrior", "Climate Champion", "Earth Guardian"]
+
+DAYS_PER_YEAR = 365
+WEEKS_PER_YEAR = 52
+MONTHS_PER_YEAR = 12
+
+
+def encode(values, vocabulary: Sequence[str]) -> np.ndarray:
+    """Map option names (e.g. "Car") to their integer codes.
+
+    Integer input is taken to be codes already and is passed through once
+    every code is in range.
+    """
+    values = np.atleast_1d(values)
+    if np.issubdtype(values.dtype, np.integer):
+        invalid = values[(values < 0) | (values >= len(vocabulary))]
+        if invalid.size:
+            raise ValueError(f"Unknown option code {int(invalid[0])}, expected 0 to {len(vocabulary) - 1} "
+                             f"for {list(vocabulary)}")
+        return values.astype(np.intp, copy=False)
+    # Look up each distinct name once, then scatter the codes back
+    names, inverse = np.unique(values.astype(str), return_inverse=True)
+    lookup = {name: code for code, name in enumerate(vocabulary)}
+    unknown = [name for name in names if name not in lookup]
+    if unknown:
+        raise ValueError(f"Unknown option {str(unknown[0])!r}, expected one of {list(vocabulary)}")
+    codes = np.array([lookup[name] for name in names], dtype=np.intp)
+    return codes[inverse.reshape(values.shape)]
+
+
+def transport_emissions(distance, mode, flights=0, region=DEFAULT_REGION,
+                        store: Optional[factors.FactorStore] = None) -> np.ndarray:
+    distance = np.asarray(distance, dtype=np.float64)
+    mode = np.asarray(mode, dtype=np.intp)
+    emissions = distance * DAYS_PER_YEAR * factors.gather(region, TRANSPORT_CODES[mode], store)
+    flights = np.where(mode == AIRPLANE, np.asarray(flights, dtype=np.float64), 0.0)
+    return emissions + flights * KM_PER_FLIGHT * factors.gather(region, TRANSPORT_CODES[AIRPLANE], store)
+
+
+def energy_emissions(electricity, cooking_fuel, fuel_consumption=0, region=DEFAULT_REGION,
+                     store: Optional[factors.FactorStore] = None) -> np.ndarray:
+    electricity = np.asarray(electricity, dtype=np.float64)
+    fuel_consumption = np.asarray(fuel_consumption, dtype=np.float64)
+    cooking_fuel = np.asarray(cooking_fuel, dtype=np.intp)
+    return (electricity * MONTHS_PER_YEAR * factors.gather(region, ELECTRICITY, store)
+            + fuel_consumption * MONTHS_PER_YEAR * factors.gather(region, FUEL_CODES[cooking_fuel], store))
+
+
+def waste_emissions(waste, region=DEFAULT_REGION, store: Optional[factors.FactorStore] = None) -> np.ndarray:
+    """`waste` is an (N, 4) array of weekly kg in WASTE_TYPES order."""
+    store = store or factors.DEFAULT_STORE
+    waste = np.asarray(waste, dtype=np.float64)
+    rows = np.expand_dims(store.resolve(region), -1)
+    return (waste * WEEKS_PER_YEAR * store.gather(rows, WASTE_CODES)).sum(axis=-1)
+
+
+def diet_emissions(meals_per_day, diet, region=DEFAULT_REGION,
+                   store: Optional[factors.FactorStore] = None) -> np.ndarray:
+    meals_per_day = np.asarray(meals_per_day, dtype=np.float64)
+    diet = np.asarray(diet, dtype=np.intp)
+    return meals_per_day * DAYS_PER_YEAR * factors.gather(region, DIET_CODES[diet], store)
+
+
+def calculate_emissions(distance, transport_mode, electricity, cooking_fuel, waste,
+                        meals_per_day, diet, flights=0, fuel_consumption=0,
+                        region=DEFAULT_REGION, store: Optional[factors.FactorStore] = None
+                        ) -> Dict[str, np.ndarray]:
+    """Score N profiles at once.
+
+    Mode, fuel and diet arguments are integer code arrays (see `encode`).
+    `region` is a region name (latest version), a (region, version) pair or
+    an array of per-row `FactorStore.row` codes. Returns per-category and
+    total annual kg CO2e arrays keyed like `st.session_state.calculation_results`.
+    """
+    store = store or factors.DEFAULT_STORE
+    region = store.resolve(region)
+    results = {
+        "transport": transport_emissions(distance, transport_mode, flights, region, store),
+        "energy": energy_emissions(electricity, cooking_fuel, fuel_consumption, region, store),
+        "waste": waste_emissions(waste, region, store),
+        "diet": diet_emissions(meals_per_day, diet, region, store),
+    }
+    results["total"] = results["transport"] + results["energy"] + results["waste"] + results["diet"]
+    return results
+
+
+def activity_quantities(distance, transport_mode, electricity, cooking_fuel, waste,
+                        meals_per_day, diet, flights=0, fuel_consumption=0) -> np.ndarray:
+    """Annual activity amounts as an (N, activity) matrix.
+
+    Multiplying by a factor vector gives the same totals as
+    `calculate_emissions`; this form lets callers evaluate many sampled
+    factor vectors at once (see uncertainty.py).
+    """
+    transport_mode = np.atleast_1d(np.asarray(transport_mode, dtype=np.intp))
+    cooking_fuel = np.atleast_1d(np.asarray(cooking_fuel, dtype=np.intp))
+    diet = np.atleast_1d(np.asarray(diet, dtype=np.intp))
+    waste = np.atleast_2d(np.asarray(waste, dtype=np.float64))
+    n = len(transport_mode)
+    rows = np.arange(n)
+
+    def column(values):
+        return np.broadcast_to(np.asarray(values, dtype=np.float64), (n,))
+
+    quantities = np.zeros((n, len(factors.ACTIVITIES)))
+    quantities[rows, TRANSPORT_CODES[transport_mode]] += column(distance) * DAYS_PER_YEAR
+    flights = np.where(transport_mode == AIRPLANE, column(flights), 0.0)
+    quantities[:, TRANSPORT_CODES[AIRPLANE]] += flights * KM_PER_FLIGHT
+    quantities[:, ELECTRICITY] = column(electricity) * MONTHS_PER_YEAR
+    quantities[rows, FUEL_CODES[cooking_fuel]] += column(fuel_consumption) * MONTHS_PER_YEAR
+    quantities[:, WASTE_CODES] = waste * WEEKS_PER_YEAR
+    quantities[rows, DIET_CODES[diet]] += column(meals_per_day) * DAYS_PER_YEAR
+    return quantities
+
+
+def certificate_tier(total, region=DEFAULT_REGION, store: Optional[factors.FactorStore] = None) -> np.ndarray:
+    """Return the highest CERTIFICATE_TIERS code earned for each total (kg CO2e)."""
+    store = store or factors.DEFAULT_STORE
+    averages = np.take(store.averages, store.resolve(region), axis=0)
+    tonnes = np.asarray(total, dtype=np.float64) / 1000
+    return np.select(
+        [tonnes < EARTH_GUARDIAN_LIMIT,
+         tonnes < averages[..., factors.NATIONAL],
+         tonnes < averages[..., factors.GLOBAL]],
+        [3, 2, 1],
+        default=0,
+    )
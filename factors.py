@@ -0,0 +1,252 @@
+"""Emission factor store, compiled to dense arrays when it is loaded.
+
+Factor sets for every region and dated version live on disk, either as the
+human-edited `emission_factors.json` or as a compact binary file built from
+it (`python factors.py build emission_factors.json emission_factors.bin`).
+Large binary files are memory-mapped. Each set is one row of a
+(set x activity) matrix with stable integer activity codes, so the engine
+gathers factors by index and a (region, version) lookup is a dict hit.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+import flat_file
+
+DATA_PATH = os.environ.get(
+    "EMISSION_FACTORS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "emission_factors.json"),
+)
+
+# Activity codes are positions in this list. Append new activities at the
+# end so existing codes never change.
+ACTIVITIES = [
+    "Car", "Bus", "Train", "Motorcycle", "Airplane",
+    "Electricity",
+    "LPG", "CNG", "Electric",
+    "Vegan", "Vegetarian", "Non-vegetarian",
+    "Organic", "Plastic", "Paper", "Metal",
+]
+ACTIVITY_CODES: Dict[str, int] = {name: code for code, name in enumerate(ACTIVITIES)}
+
+# Per-capita baselines stored with each set (t CO2e per year)
+AVERAGES = ["global", "national"]
+GLOBAL, NATIONAL = range(len(AVERAGES))
+
+# Each factor's uncertainty is a coefficient of variation of a lognormal
+# distribution whose mean is the factor itself; 0 means exact
+UNCERTAINTY_COLUMNS = [f"{name}:cv" for name in ACTIVITIES]
+COLUMNS = ACTIVITIES + AVERAGES + UNCERTAINTY_COLUMNS
+
+MAGIC = b"PCCFACT1"
+MMAP_THRESHOLD = 1 << 20  # memory-map binary stores larger than 1 MiB
+
+
+class FactorStore:
+    """Immutable collection of factor sets keyed by (region, version)."""
+
+    def __init__(self, keys: Sequence[Tuple[str, str]], matrix: np.ndarray, averages: np.ndarray,
+                 uncertainty: Optional[np.ndarray] = None):
+        self.keys = tuple((str(region), str(version)) for region, version in keys)
+        self.matrix = matrix
+        self.averages = averages
+        self.uncertainty = np.zeros_like(matrix) if uncertainty is None else uncertainty
+        for array in (self.matrix, self.averages, self.uncertainty):
+            if array.flags.writeable:
+                array.flags.writeable = False
+
+        self._rows = MappingProxyType({key: row for row, key in enumerate(self.keys)})
+        latest = {}
+        for region, version in self.keys:
+            if region not in latest or version > latest[region]:
+                latest[region] = version
+        self._latest = MappingProxyType({region: self._rows[(region, version)]
+                                         for region, version in latest.items()})
+        self.regions = tuple(latest)
+        # File the store was loaded from, so worker processes can load it
+        # themselves instead of receiving a copy
+        self.path: Optional[str] = None
+
+    def __reduce__(self):
+        # The lookup tables are read-only proxies, which cannot be pickled;
+        # rebuild them from the arrays on the other side
+        return (self.__class__, (self.keys, np.asarray(self.matrix), np.asarray(self.averages),
+                                 np.asarray(self.uncertainty)))
+
+    def versions(self, region: str) -> Tuple[str, ...]:
+        return tuple(sorted(version for key_region, version in self.keys if key_region == region))
+
+    def row(self, region: str, version: Optional[str] = None) -> int:
+        """Row index of a factor set; the latest version when `version` is None."""
+        try:
+            if version is None:
+                return self._latest[region]
+            return self._rows[(region, str(version))]
+        except KeyError:
+            raise ValueError(f"Unknown factor set {region!r} version {version!r}, "
+                             f"expected a region in {list(self.regions)}") from None
+
+    def resolve(self, region):
+        """Accept a region name, a (region, version) pair, or row code(s)."""
+        if isinstance(region, str):
+            return np.intp(self.row(region))
+        if isinstance(region, tuple):
+            return np.intp(self.row(*region))
+        return np.asarray(region, dtype=np.intp)
+
+    def gather(self, region, activity) -> np.ndarray:
+        """Look up factors for (region, activity) code arrays in one indexing pass."""
+        return self.matrix[self.resolve(region), activity]
+
+    def factors(self, region: str, version: Optional[str] = None) -> Dict[str, float]:
+        values = self.matrix[self.row(region, version)]
+        return {name: float(value) for name, value in zip(ACTIVITIES, values) if not np.isnan(value)}
+
+    def average(self, region: str, kind: str = "national", version: Optional[str] = None) -> float:
+        return float(self.averages[self.row(region, version), AVERAGES.index(kind)])
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FactorStore":
+        sets = data["sets"]
+        matrix = np.full((len(sets), len(ACTIVITIES)), np.nan)
+        averages = np.full((len(sets), len(AVERAGES)), np.nan)
+        uncertainty = np.zeros((len(sets), len(ACTIVITIES)))
+        keys = []
+        for row, factor_set in enumerate(sets):
+            keys.append((factor_set["region"], factor_set["version"]))
+            unknown = set(factor_set["factors"]) - set(ACTIVITY_CODES)
+            if unknown:
+                raise ValueError(f"Unknown activities in {keys[-1]}: {sorted(unknown)}")
+            for name, value in factor_set["factors"].items():
+                matrix[row, ACTIVITY_CODES[name]] = value
+            for kind, value in factor_set.get("averages", {}).items():
+                averages[row, AVERAGES.index(kind)] = value
+            for name, value in factor_set.get("uncertainty", {}).items():
+                uncertainty[row, ACTIVITY_CODES[name]] = value
+        if len(set(keys)) != len(keys):
+            raise ValueError("Duplicate (region, version) factor sets")
+        return cls(keys, matrix, averages, uncertainty)
+
+    @classmethod
+    def load(cls, path: str = DATA_PATH) -> "FactorStore":
+        """Load a JSON source file or a binary store written by `save`."""
+        if path.endswith(".json"):
+            with open(path, "r") as f:
+                store = cls.from_dict(json.load(f))
+            store.path = path
+            return store
+
+        header, offset = flat_file.read_header(path, MAGIC, "an emission factor store")
+        keys = [tuple(key) for key in header["keys"]]
+        columns = header["columns"]
+        shape = (len(keys), len(columns))
+        if os.path.getsize(path) > MMAP_THRESHOLD:
+            data = np.memmap(path, dtype="<f8", mode="r", offset=offset, shape=shape)
+        else:
+            data = np.fromfile(path, dtype="<f8", offset=offset).reshape(shape)
+
+        if columns != COLUMNS:
+            # Written with a different activity list; realign to our codes
+            realigned = np.full((len(keys), len(COLUMNS)), np.nan)
+            realigned[:, len(ACTIVITIES) + len(AVERAGES):] = 0.0
+            for code, name in enumerate(COLUMNS):
+                if name in columns:
+                    realigned[:, code] = data[:, columns.index(name)]
+            data = realigned
+        averages_end = len(ACTIVITIES) + len(AVERAGES)
+        store = cls(keys, data[:, :len(ACTIVITIES)], data[:, len(ACTIVITIES):averages_end],
+                    data[:, averages_end:])
+        store.path = path
+        return store
+
+    def save(self, path: str):
+        """Write the store as a header plus one float64 matrix, ready to memory-map."""
+        flat_file.write(path, MAGIC, {"keys": self.keys, "columns": COLUMNS},
+                        np.hstack([self.matrix, self.averages, self.uncertainty]), "<f8")
+
+
+DEFAULT_STORE = FactorStore.load(DATA_PATH)
+DEFAULT_REGION = DEFAULT_STORE.regions[0]
+
+
+class FactorReloader:
+    """Hands out the current FactorStore, swapping in a new snapshot when the file changes.
+
+    Callers grab `current()` once and use that snapshot for the whole
+    computation, so work in flight finishes on the old factors while new
+    work sees the new ones. Stores are immutable, so the swap is a single
+    reference assignment. Replace the file atomically (write elsewhere,
+    then `os.replace`) so a memory-mapped old snapshot stays valid.
+    """
+
+    def __init__(self, path: str = DATA_PATH, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._stamp = _file_stamp(path)
+        self._snapshot = FactorStore.load(path)
+        self._checked = time.monotonic()
+
+    def current(self) -> FactorStore:
+        if time.monotonic() - self._checked >= self.check_interval:
+            self._maybe_reload()
+        return self._snapshot
+
+    def _maybe_reload(self):
+        # Only one thread stats and parses the file; the rest keep reading
+        # the current snapshot instead of waiting
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked = time.monotonic()
+            stamp = _file_stamp(self.path)
+            if stamp == self._stamp:
+                return
+            try:
+                snapshot = FactorStore.load(self.path)
+            except (OSError, ValueError, KeyError):
+                # Missing or half-written file: keep serving the old
+                # snapshot and try again on the next check
+                return
+            self._snapshot = snapshot
+            self._stamp = stamp
+            self.reloads += 1
+        finally:
+            self._lock.release()
+
+
+def _file_stamp(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def activity_codes(names: Sequence[str]) -> np.ndarray:
+    """Return the activity codes for `names`, e.g. to translate option codes."""
+    return np.array([ACTIVITY_CODES[name] for name in names], dtype=np.intp)
+
+
+def gather(region, activity, store: Optional[FactorStore] = None) -> np.ndarray:
+    return (store or DEFAULT_STORE).gather(region, activity)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 3 or argv[0] != "build":
+        sys.exit("usage: python factors.py build SOURCE.json OUTPUT.bin")
+    store = FactorStore.load(argv[1])
+    store.save(argv[2])
+    print(f"Wrote {len(store.keys)} factor sets for {len(store.regions)} regions to {argv[2]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Dashboard figures, built once per distinct result and shared across sessions.
+
+Plotly figure construction is one of the larger per-rerun costs, and many
+users end up with identical results (the slider defaults, for one). Figures
+are cached as serialized JSON in a process-wide LRU keyed by the results,
+the comparison baselines and the theme, so a rerun that shows the same
+results only parses JSON.
+"""
+from functools import lru_cache
+from typing import Dict, NamedTuple, Tuple
+
+FIGURE_CACHE_SIZE = 256
+
+CATEGORY_NAMES = ['Transportation', 'Energy', 'Waste', 'Diet']
+CATEGORY_COLORS = ['#3498db', '#2ecc71', '#e74c3c', '#f1c40f']
+COMPARISON_COLORS = ['#76c7c0', '#666666', '#888888']
+
+# Font colour per Streamlit base theme
+THEMES = {
+    'dark': 'white',
+    'light': '#31333F',
+}
+
+
+class DashboardFigures(NamedTuple):
+    """Plotly figure JSON for the three Dashboard charts."""
+    by_category: str
+    distribution: str
+    comparison: str
+
+
+def results_key(results: Dict[str, float]) -> Tuple[float, ...]:
+    """Hashable key for a `calculation_results` dict (kg CO2e per category, then total)."""
+    return tuple(float(results[name]) for name in ['transport', 'energy', 'waste', 'diet', 'total'])
+
+
+def _layout(theme: str, **layout) -> dict:
+    return dict(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color=THEMES[theme], size=12),
+        title_font_size=16,
+        height=300,
+        margin=dict(t=30, b=20, l=20, r=20),
+        **layout
+    )
+
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def dashboard_figures(results: Tuple[float, ...], region: str, global_average: float,
+                      national_average: float, theme: str = 'dark') -> DashboardFigures:
+    """Build the Dashboard charts for `results_key(...)` and serialize them.
+
+    The cached strings are immutable, so every session can share them.
+    pandas and Plotly are imported here so they load on the first miss
+    rather than at app startup.
+    """
+    import pandas as pd
+    import plotly.express as px
+
+    emissions_data = pd.DataFrame({
+        'Category': CATEGORY_NAMES,
+        'Emissions (t CO2)': [value / 1000 for value in results[:4]],
+    })
+
+    by_category = px.bar(
+        emissions_data,
+        x='Category',
+        y='Emissions (t CO2)',
+        title='Emissions by Category',
+        color='Category',
+        color_discrete_sequence=CATEGORY_COLORS
+    )
+    by_category.update_layout(_layout(
+        theme,
+        showlegend=False,
+        xaxis=dict(title=''),
+        yaxis=dict(title='t CO2/year')
+    ))
+
+    distribution = px.pie(
+        emissions_data,
+        values='Emissions (t CO2)',
+        names='Category',
+        title='Distribution of Emissions',
+        color_discrete_sequence=CATEGORY_COLORS
+    )
+    distribution.update_layout(_layout(
+        theme,
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=-0.2,
+            xanchor="center",
+            x=0.5,
+            font=dict(color=THEMES[theme], size=11)
+        )
+    ))
+
+    comparison_data = pd.DataFrame({
+        'Source': ['Your Emissions', 'Global Average', f'{region} Average'],
+        'Emissions': [results[4] / 1000, global_average, national_average]
+    })
+    comparison = px.bar(
+        comparison_data,
+        x='Source',
+        y='Emissions',
+        title='Emissions Comparison',
+        color='Source',
+        color_discrete_sequence=COMPARISON_COLORS
+    )
+    comparison.update_layout(_layout(
+        theme,
+        showlegend=False,
+        xaxis=dict(title='', tickangle=45),
+        yaxis=dict(title='t CO2/year')
+    ))
+
+    return DashboardFigures(by_category.to_json(), distribution.to_json(), comparison.to_json())
@@ -0,0 +1,36 @@
+"""Binary files holding one JSON header and one matrix, ready to memory-map.
+
+Layout: a magic tag, the header length (8 bytes, little-endian), the UTF-8
+JSON header, zero padding to an 8-byte boundary, then the matrix bytes.
+Used by the factor store (factors.py) and the intent model (intent_model.py).
+"""
+import json
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+
+def write(path: str, magic: bytes, header: Dict[str, Any], matrix: np.ndarray, dtype: str):
+    encoded = json.dumps(header).encode("utf-8")
+    prefix = magic + len(encoded).to_bytes(8, "little") + encoded
+    with open(path, "wb") as f:
+        f.write(prefix + b"\0" * (_aligned(len(prefix)) - len(prefix)))
+        f.write(np.asarray(matrix, dtype=dtype).tobytes())
+
+
+def read_header(path: str, magic: bytes, description: str) -> Tuple[Dict[str, Any], int]:
+    """The header of `path` and the byte offset of its matrix.
+
+    Raises ValueError when the file is not `description` (a wrong magic
+    tag or an unreadable header).
+    """
+    with open(path, "rb") as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError(f"{path} is not {description}")
+        header_size = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_size))
+    return header, _aligned(len(magic) + 8 + header_size)
+
+
+def _aligned(size: int) -> int:
+    return (size + 7) // 8 * 8
@@ -0,0 +1,164 @@
+"""Typo-tolerant word lookup with a symmetric-deletion (SymSpell) index.
+
+Every vocabulary word is indexed under all strings reachable from its
+prefix by deleting up to `max_distance` characters. A misspelled term is
+looked up the same way, so candidates are found with dict hits instead of
+comparing against the whole vocabulary, and only those candidates get an
+exact edit-distance check. Indexing only a fixed-length prefix keeps the
+index size bounded however long the words are.
+
+`python fuzzy.py` compares match rate and latency against plain substring
+matching on a generated corpus of misspelled questions.
+"""
+import re
+from itertools import combinations
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+
+_WORD = re.compile(r"[a-z]+")
+
+
+def max_distance_for(word: str) -> int:
+    """Edits allowed for a word of this length; short words must be exact,
+    otherwise "stop" would be read as "shop"."""
+    if len(word) <= 4:
+        return 0
+    if len(word) <= 7:
+        return 1
+    return 2
+
+
+class SpellingIndex:
+    """Immutable deletion index over a vocabulary."""
+
+    def __init__(self, words: Iterable[str], max_distance: int = MAX_DISTANCE,
+                 prefix_length: int = PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words: FrozenSet[str] = frozenset(word.lower() for word in words)
+        deletes: Dict[str, Set[str]] = {}
+        for word in self.words:
+            for variant in _deletes(word[:prefix_length], max_distance):
+                deletes.setdefault(variant, set()).add(word)
+        self._deletes = {variant: frozenset(words) for variant, words in deletes.items()}
+
+    def __len__(self) -> int:
+        return len(self._deletes)
+
+    def lookup(self, term: str, max_distance: Optional[int] = None) -> Optional[Tuple[str, int]]:
+        """Closest vocabulary word to `term` and its distance, or None.
+
+        Ties go to the alphabetically first word, so results are stable.
+        """
+        term = term.lower()
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if term in self.words:
+            return term, 0
+        if limit == 0:
+            return None
+        candidates = set()
+        for variant in _deletes(term[:self.prefix_length], limit):
+            candidates.update(self._deletes.get(variant, ()))
+        best = None
+        for word in candidates:
+            if abs(len(word) - len(term)) > limit:
+                continue
+            distance = edit_distance(term, word, limit)
+            if distance <= limit and (best is None or (distance, word) < best):
+                best = (distance, word)
+        return (best[1], best[0]) if best else None
+
+    def correct(self, text: str) -> str:
+        """`text` with misspelled vocabulary words replaced by the real ones."""
+        def replace(match):
+            word = match.group(0)
+            found = self.lookup(word, max_distance_for(word))
+            return found[0] if found else word
+        return _WORD.sub(replace, text.lower())
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    variants = {word}
+    for removed in range(1, min(max_distance, len(word)) + 1):
+        for positions in combinations(range(len(word)), removed):
+            variants.add("".join(char for i, char in enumerate(word) if i not in positions))
+    return variants
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (adjacent swaps count once), or
+    `limit + 1` as soon as it is known to exceed `limit`."""
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def _misspell(word: str, rng) -> str:
+    """Apply one or two random typos: deletion, swap, substitution or insertion."""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for _ in range(1 if len(word) < 8 else rng.choice([1, 2])):
+        i = rng.randrange(1, len(word) - 1)
+        kind = rng.choice(["delete", "swap", "substitute", "insert"])
+        if kind == "delete":
+            word = word[:i] + word[i + 1:]
+        elif kind == "swap":
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        elif kind == "substitute":
+            word = word[:i] + rng.choice(letters) + word[i + 1:]
+        else:
+            word = word[:i] + rng.choice(letters) + word[i:]
+    return word
+
+
+def benchmark(seed: int = 0, per_keyword: int = 20):
+    import random
+    import time
+
+    from chatbot import KEYWORDS, PRIORITY_TOPICS, CarbonFootprintChatbot
+
+    rng = random.Random(seed)
+    templates = ["how can I reduce my {}", "tips about {} please", "{} emissions", "is {} bad"]
+    corpus = []
+    for topic, words in KEYWORDS.items():
+        if topic in PRIORITY_TOPICS:
+            continue
+        for word in words:
+            if " " in word or len(word) < 5:
+                continue
+            for _ in range(per_keyword):
+                corpus.append((rng.choice(templates).format(_misspell(word, rng)), topic))
+
+    def substring_topic(text):
+        text = text.lower()
+        for topic, words in KEYWORDS.items():
+            if topic not in PRIORITY_TOPICS and any(word in text for word in words):
+                return topic
+        return None
+
+    bot = CarbonFootprintChatbot()
+    approaches = [("substring", substring_topic), ("fuzzy", bot.get_topic)]
+    print(f"{len(corpus)} misspelled queries")
+    for name, route in approaches:
+        start = time.perf_counter()
+        routed = [route(text) for text, _ in corpus]
+        elapsed = time.perf_counter() - start
+        matched = sum(topic == expected for topic, (_, expected) in zip(routed, corpus))
+        print(f"{name:10s} {matched / len(corpus) * 100:5.1f}% routed correctly, "
+              f"{elapsed / len(corpus) * 1e6:7.1f} us per query")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,429 +1,67 @@
 import streamlit as st
-import pandas as pd
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
+import copy
 import os
-from dotenv import load_dotenv
 import json
+import time
+import uuid
 from datetime import datetime
-import plotly.express as px
-import plotly.graph_objects as go
 from chatbot import CarbonFootprintChatbot
+import chat_history
+import chat_service
+import emissions
+import factors
+import figures
+import perf
+import progress_store
+import reactive
+import scenarios
+import uncertainty
+
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'style.css')
 
 # Set wide layout and page name (must be first Streamlit command)
 st.set_page_config(layout="wide", page_title="Carbon Calculator")
+rerun_start = time.perf_counter()
+
+# Styles live in style.css and are sent as one block. It is above
+# global.minCachedMessageSize (.streamlit/config.toml), so Streamlit sends it
+# once per session and afterwards only a reference to its content hash.
+@st.cache_resource
+def load_stylesheet():
+    with open(STYLESHEET_PATH, 'r', encoding='utf-8') as f:
+        return f'<style>\n{f.read()}</style>'
+
+st.markdown(load_stylesheet(), unsafe_allow_html=True)
+
+# Initialize services; one chatbot per process, shared by every session
+@st.cache_resource
+def get_chatbot():
+    # CHATBOT_MODE=retrieval answers from the passage index instead of
+    # whole canned articles
+    return CarbonFootprintChatbot(os.getenv("CHATBOT_MODE", "keywords"))
+
+chatbot = get_chatbot()
+
+# Answers are generated on the chat service's event loop and streamed into
+# the Chat tab. CHAT_BACKEND=fake-model swaps in a slow model stand-in
+# (FAKE_MODEL_LATENCY seconds before the first word) to exercise streaming.
+@st.cache_resource
+def get_chat_service():
+    if os.getenv("CHAT_BACKEND", "keywords") == "fake-model":
+        backend = chat_service.FakeModelBackend(
+            chatbot, first_token_latency=float(os.getenv("FAKE_MODEL_LATENCY", "0.5")))
+    else:
+        backend = chat_service.KeywordBackend(chatbot)
+    return chat_service.ChatService(
+        backend, timeout=float(os.getenv("CHAT_TIMEOUT", chat_service.DEFAULT_TIMEOUT)))
 
-# Add custom CSS for background and styling
-st.markdown("""
-    <style>
-    /* Main background */
-    .stApp {
-        background: linear-gradient(135deg, #1e1e2f 0%, #121212 100%);
-        min-height: 100vh;
-        color: #e0e0e0;
-        font-family: 'Arial', sans-serif;
-        font-size: 1.1rem;
-        padding-top: 0;
-    }
-
-    /* Add a subtle pattern overlay */
-    .stApp::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        bottom: 0;
-        background: radial-gradient(circle at 50% 50%, rgba(255, 255, 255, 0.05) 0%, transparent 50%);
-        pointer-events: none;
-    }
-
-    /* Title styling */
-    .big-font {
-        font-size: 2.5rem !important;
-        font-weight: 800;
-        color: #76c7c0;  /* Vibrant teal for headers */
-        text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.5);
-        text-align: center;
-        margin-bottom: 1rem;
-        letter-spacing: 0.5px;
-    }
-
-    /* Tab styling */
-    .stTabs [data-baseweb="tab"] {
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 12px;
-        padding: 10px 20px;
-        margin: 0 5px;
-        color: #e0e0e0;
-        font-weight: 600;
-        font-size: 1.1rem;
-        border: none;
-        transition: all 0.2s ease;
-    }
-
-    .stTabs [aria-selected="true"] {
-        background: rgba(255, 255, 255, 0.2) !important;
-        color: #76c7c0 !important;
-        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.3);
-        font-weight: 700;
-    }
-
-    /* Button styling */
-    .stButton>button {
-        background: #76c7c0;
-        color: white;
-        border: none;
-        border-radius: 12px;
-        padding: 12px 30px;
-        font-weight: 600;
-        font-size: 1.1rem;
-        transition: all 0.3s ease;
-        text-transform: none;
-        letter-spacing: 0.5px;
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.3);
-    }
-
-    .stButton>button:hover {
-        background: #5aa89b;
-        transform: translateY(-2px);
-        box-shadow: 0 6px 12px rgba(0, 0, 0, 0.4);
-    }
-
-    /* Input styling */
-    .stTextInput>div>div>input {
-        border-radius: 12px;
-        padding: 15px 20px;
-        background: rgba(255, 255, 255, 0.1);
-        color: #e0e0e0;
-        border: 2px solid rgba(255, 255, 255, 0.2);
-        font-size: 1.1rem;
-        transition: all 0.2s ease;
-    }
-
-    .stTextInput>div>div>input:focus {
-        border-color: #76c7c0;
-        box-shadow: 0 0 0 3px rgba(118, 199, 192, 0.3);
-    }
-
-    /* Chat message styling */
-    .chat-message {
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 12px;
-        padding: 20px;
-        margin: 15px 0;
-        border: 2px solid rgba(255, 255, 255, 0.2);
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.3);
-        color: #e0e0e0;
-        font-size: 1.1rem;
-    }
-
-    /* Plotly chart container */
-    .js-plotly-plot {
-        background: rgba(255, 255, 255, 0.1) !important;
-        border-radius: 12px;
-        padding: 20px;
-        margin: 15px 0;
-        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.3);
-        border: 2px solid rgba(255, 255, 255, 0.2);
-    }
-
-    /* Emission previews */
-    .emission-preview {
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 10px;
-        padding: 10px;
-        margin: 10px 0;
-        text-align: center;
-        transition: all 0.3s ease;
-    }
-
-    .emission-preview:hover {
-        background: rgba(255, 255, 255, 0.15);
-        transform: translateY(-2px);
-    }
-
-    .emission-preview p {
-        margin: 0;
-        font-size: 1rem;
-        color: #76c7c0;
-    }
-
-    /* Total emissions */
-    .total-emissions {
-        background: rgba(118, 199, 192, 0.2);
-        border-radius: 15px;
-        padding: 20px;
-        margin: 20px 0;
-        text-align: center;
-        border: 2px solid rgba(118, 199, 192, 0.3);
-    }
-
-    .total-emissions h3 {
-        margin: 0;
-        color: #76c7c0;
-        font-size: 1.5rem;
-    }
-
-    /* Certificate modal styling */
-    .certificate-modal {
-        display: none;
-        position: fixed;
-        top: 0;
-        left: 0;
-        width: 100%;
-        height: 100%;
-        background: rgba(0, 0, 0, 0.9);
-        z-index: 1000;
-        justify-content: center;
-        align-items: center;
-    }
-
-    .certificate-content {
-        background: linear-gradient(135deg, #1e1e2f 0%, #121212 100%);
-        padding: 40px;
-        border-radius: 20px;
-        text-align: center;
-        max-width: 800px;
-        width: 90%;
-        position: relative;
-        box-shadow: 0 0 30px rgba(0, 0, 0, 0.5);
-    }
-
-    .certificate-title {
-        font-size: 3rem;
-        color: #76c7c0;
-        margin-bottom: 20px;
-        text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.5);
-    }
-
-    .certificate-name {
-        font-size: 2.5rem;
-        color: #e0e0e0;
-        margin-bottom: 10px;
-    }
-
-    .certificate-description {
-        font-size: 1.2rem;
-        color: #e0e0e0;
-        margin-bottom: 30px;
-        line-height: 1.6;
-    }
-
-    .certificate-date {
-        font-size: 1.1rem;
-        color: rgba(255, 255, 255, 0.8);
-        margin-top: 20px;
-    }
-
-    .certificate-seal {
-        position: absolute;
-        bottom: 20px;
-        right: 20px;
-        font-size: 3rem;
-        color: #76c7c0;
-    }
-
-    /* Custom scrollbar */
-    ::-webkit-scrollbar {
-        width: 10px;
-    }
-
-    ::-webkit-scrollbar-track {
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 6px;
-    }
-
-    ::-webkit-scrollbar-thumb {
-        background: rgba(118, 199, 192, 0.4);
-        border-radius: 6px;
-    }
-
-    ::-webkit-scrollbar-thumb:hover {
-        background: rgba(118, 199, 192, 0.6);
-    }
-
-    /* Metric Cards */
-    .metric-card {
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 15px;
-        padding: 20px;
-        margin: 10px 0;
-        text-align: center;
-        transition: all 0.3s ease;
-    }
-
-    .metric-card:hover {
-        transform: translateY(-5px);
-        background: rgba(255, 255, 255, 0.15);
-    }
-
-    .metric-value {
-        font-size: 2rem;
-        font-weight: bold;
-        color: #76c7c0;
-        margin: 10px 0;
-    }
-
-    .metric-comparison {
-        font-size: 0.9rem;
-        color: #888;
-    }
-
-    .status-good {
-        color: #2ecc71 !important;
-    }
-
-    .status-bad {
-        color: #e74c3c !important;
-    }
-
-    /* Recommendation Cards */
-    .recommendation-card {
-        display: flex;
-        align-items: center;
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 15px;
-        padding: 15px;
-        margin: 10px 0;
-        transition: all 0.3s ease;
-    }
-
-    .recommendation-card:hover {
-        transform: translateX(5px);
-        background: rgba(255, 255, 255, 0.15);
-    }
-
-    .rec-icon {
-        font-size: 2rem;
-        margin-right: 15px;
-        min-width: 50px;
-        text-align: center;
-    }
-
-    .rec-content h4 {
-        margin: 0;
-        color: #76c7c0;
-    }
-
-    .rec-content p {
-        margin: 5px 0 0 0;
-        font-size: 0.9rem;
-    }
-
-    .progress-bar {
-        width: 100%;
-        height: 20px;
-        background-color: rgba(255, 255, 255, 0.1);
-        border-radius: 10px;
-        overflow: hidden;
-        margin: 10px 0;
-    }
-    
-    .progress {
-        height: 100%;
-        background-color: #4CAF50;
-        transition: width 0.3s ease;
-    }
-    
-    .stCard {
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 15px;
-        padding: 20px;
-        margin: 15px 0;
-        border: 2px solid rgba(76, 175, 80, 0.3);
-    }
-    
-    .stCard h4 {
-        color: #4CAF50;
-        margin-bottom: 10px;
-    }
-
-    .certificate-card {
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-    }
-    
-    .certificate-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 10px 20px rgba(0,0,0,0.2);
-    }
-    
-    .certificate-modal {
-        background: linear-gradient(135deg, #1e1e2f 0%, #121212 100%);
-        padding: 40px;
-        border-radius: 20px;
-        text-align: center;
-        position: relative;
-        max-width: 800px;
-        margin: 0 auto;
-        border: 3px solid gold;
-    }
-    
-    .certificate-title {
-        font-size: 2.5rem;
-        color: gold;
-        margin-bottom: 20px;
-        text-transform: uppercase;
-        letter-spacing: 2px;
-    }
-    
-    .certificate-icon {
-        font-size: 4rem;
-        margin-bottom: 20px;
-    }
-    
-    .certificate-name {
-        font-size: 2rem;
-        color: white;
-        margin-bottom: 10px;
-    }
-    
-    .certificate-description {
-        color: #e0e0e0;
-        font-size: 1.2rem;
-        margin-bottom: 30px;
-    }
-    
-    .certificate-seal {
-        position: absolute;
-        bottom: 20px;
-        right: 20px;
-        font-size: 5rem;
-        opacity: 0.5;
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-# Initialize services
-chatbot = CarbonFootprintChatbot()
+@st.cache_resource
+def get_factor_reloader():
+    return factors.FactorReloader()
 
-# Define emission factors (kg CO2e per unit)
-EMISSION_FACTORS = {
-    "India": {
-        # Transportation (kg CO2e per km)
-        "Car": 0.2,
-        "Bus": 0.1,
-        "Train": 0.05,
-        "Motorcycle": 0.1,
-        "Airplane": 0.25,
-        
-        # Energy (kg CO2e per kWh)
-        "Electricity": 0.85,
-        "LPG": 2.5,
-        "CNG": 2.2,
-        
-        # Diet (kg CO2e per meal)
-        "Vegan": 0.5,
-        "Vegetarian": 0.8,
-        "Non-vegetarian": 1.5,
-        
-        # Waste (kg CO2e per kg)
-        "Organic": 0.5,
-        "Plastic": 2.5,
-        "Paper": 1.0,
-        "Metal": 2.0
-    }
-}
+# One immutable factor snapshot per rerun; edits to the factor file are
+# picked up by the next rerun without restarting the server
+factor_store = get_factor_reloader().current()
 
 # Initialize session state variables
 if 'calculation_results' not in st.session_state:
@@ -462,7 +100,20 @@ if 'weekly_challenge' not in st.session_state:
         'days': 7
     }
 
-# Add function to save and load progress
+# Progress is stored per user; the user ID travels in the ?user= query
+# parameter, so a bookmarked or reloaded page gets the same progress back.
+# PROGRESS_BACKEND=journal keeps it in an append-only journal instead of SQLite.
+@st.cache_resource
+def get_progress_store():
+    if os.getenv("PROGRESS_BACKEND", "sqlite") == "journal":
+        import progress_journal
+        return progress_journal.ProgressJournal()
+    return progress_store.ProgressStore()
+
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = st.query_params.get('user') or uuid.uuid4().hex
+    st.query_params['user'] = st.session_state.user_id
+
 def save_progress():
     progress_data = {
         'certificates': st.session_state.certificate_progress,
@@ -471,35 +122,61 @@ def save_progress():
         'carbon_journey': st.session_state.carbon_journey,
         'weekly_challenge': st.session_state.weekly_challenge
     }
-    with open('user_progress.json', 'w') as f:
-        json.dump(progress_data, f)
+    # Only what changed since the last save is written
+    mutations = progress_store.diff_progress(st.session_state.get('saved_progress'), progress_data)
+    if mutations:
+        get_progress_store().apply(st.session_state.user_id, mutations)
+    st.session_state.saved_progress = copy.deepcopy(progress_data)
 
 def load_progress():
-    if os.path.exists('user_progress.json'):
-        with open('user_progress.json', 'r') as f:
-            progress_data = json.load(f)
-            st.session_state.certificate_progress = progress_data['certificates']
-            st.session_state.challenges = progress_data['challenges']
-            st.session_state.achievements = progress_data['achievements']
-            st.session_state.carbon_journey = progress_data['carbon_journey']
-            if 'weekly_challenge' in progress_data:
-                st.session_state.weekly_challenge = progress_data['weekly_challenge']
+    progress_data = get_progress_store().load(st.session_state.user_id)
+    if progress_data:
+        st.session_state.certificate_progress = progress_data['certificates']
+        st.session_state.challenges = progress_data['challenges']
+        st.session_state.achievements = progress_data['achievements']
+        st.session_state.carbon_journey = progress_data['carbon_journey']
+        if 'weekly_challenge' in progress_data:
+            st.session_state.weekly_challenge = progress_data['weekly_challenge']
+        st.session_state.saved_progress = copy.deepcopy(progress_data)
 
 # Add after session state initialization
 if 'progress_loaded' not in st.session_state:
     load_progress()
     st.session_state.progress_loaded = True
 
+# Category values are nodes of a per-session graph. Its counters are reset
+# once per script run, whichever section runs
+if 'calc_graph' not in st.session_state:
+    st.session_state.calc_graph = reactive.calculation_graph()
+st.session_state.calc_graph.begin_run()
+
+# Per-capita baselines (t CO2/year) of the selected region's factor set
+if st.session_state.get('region') not in factor_store.regions:
+    st.session_state.region = emissions.DEFAULT_REGION
+region = st.session_state.region
+global_average = factor_store.average(region, 'global')
+national_average = factor_store.average(region, 'national')
+
 # Main title with custom class
 st.markdown('<h1 class="big-font">🌍 Carbon Footprint Calculator</h1>', unsafe_allow_html=True)
 
-# Create tabs for different sections with reduced spacing
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Calculate", "📈 Dashboard", "🌱 Offset", "💬 Chat", "🎮 Challenges"])
-
-with tab1:
+# Each section is a function; only the active one runs on a rerun (see
+# the navigation below the section definitions)
+def calculate_section():
     # Main calculation section
     st.markdown('<h2 class="stHeader">Calculate Your Carbon Footprint</h2>', unsafe_allow_html=True)
     
+    st.selectbox("Select your region", factor_store.regions, key="region")
+    
+    # Emissions for every slider position, swept once per factor snapshot
+    surfaces = scenarios.get_surfaces(factor_store, region)
+    sliders = scenarios.SLIDERS
+    
+    # Category values are nodes of a per-session graph, so a rerun only
+    # recomputes what depends on the widgets that actually changed
+    graph = st.session_state.calc_graph
+    graph.set_input('surfaces', surfaces)
+    
     # Create two columns for inputs
     col1, col2 = st.columns(2)
     
@@ -517,144 +194,104 @@ with tab1:
         st.markdown('<h3 class="stSubheader">🚗 Transportation</h3>', unsafe_allow_html=True)
         transport_type = st.selectbox(
             "Select your primary mode of transport",
-            ["Car", "Bus", "Train", "Motorcycle", "Airplane"]
+            emissions.TRANSPORT_MODES,
+            key="transport_type"
         )
-        distance = st.slider("Daily commute distance (km)", 0.0, 100.0, 10.0)
+        distance = st.slider(*sliders["distance"], key="distance")
         if transport_type == "Airplane":
-            flights = st.number_input("Number of flights per year", 0, 50, 0)
+            flights = st.number_input(*sliders["flights"], key="flights")
+        else:
+            flights = 0
         
         # Real-time transport emissions calculation
-        transport_emissions = distance * 365 * EMISSION_FACTORS["India"][transport_type]
-        if transport_type == "Airplane":
-            transport_emissions += flights * 1000 * EMISSION_FACTORS["India"]["Airplane"]
-        st.session_state.transport_emissions = transport_emissions
+        transport_mode = emissions.TRANSPORT_MODES.index(transport_type)
+        graph.set_input('transport_mode', transport_mode)
+        graph.set_input('distance', distance)
+        graph.set_input('flights', flights)
+        st.session_state.transport_emissions = graph.get('transport')
         
         # Show transport emissions preview
         st.markdown(f"""
             <div class="emission-preview">
-                <p>Estimated transport emissions: {transport_emissions/1000:.1f} t CO2/year</p>
+                <p>Estimated transport emissions: {graph.get('transport_preview')} t CO2/year</p>
             </div>
         """, unsafe_allow_html=True)
         
         st.markdown('<h3 class="stSubheader">💡 Energy</h3>', unsafe_allow_html=True)
-        electricity = st.slider("Monthly electricity (kWh)", 0.0, 1000.0, 200.0)
+        electricity = st.slider(*sliders["electricity"], key="electricity")
         cooking_fuel = st.selectbox(
             "Select your cooking fuel",
-            ["LPG", "CNG", "Electric"]
+            emissions.COOKING_FUELS,
+            key="cooking_fuel"
         )
         if cooking_fuel in ["LPG", "CNG"]:
-            fuel_consumption = st.slider(f"Monthly {cooking_fuel} consumption (kg)", 0.0, 50.0, 10.0)
+            fuel_consumption = st.slider(sliders["fuel"].label.format(cooking_fuel), *sliders["fuel"][1:], key="fuel_consumption")
+        else:
+            fuel_consumption = 0
         
         # Real-time energy emissions calculation
-        energy_emissions = electricity * 12 * EMISSION_FACTORS["India"]["Electricity"]
-        if cooking_fuel in ["LPG", "CNG"]:
-            energy_emissions += fuel_consumption * 12 * EMISSION_FACTORS["India"][cooking_fuel]
-        st.session_state.energy_emissions = energy_emissions
+        fuel_code = emissions.COOKING_FUELS.index(cooking_fuel)
+        graph.set_input('electricity', electricity)
+        graph.set_input('fuel_code', fuel_code)
+        graph.set_input('fuel_consumption', fuel_consumption)
+        st.session_state.energy_emissions = graph.get('energy')
         
         # Show energy emissions preview
         st.markdown(f"""
             <div class="emission-preview">
-                <p>Estimated energy emissions: {energy_emissions/1000:.1f} t CO2/year</p>
+                <p>Estimated energy emissions: {graph.get('energy_preview')} t CO2/year</p>
             </div>
         """, unsafe_allow_html=True)
     
     with col2:
         st.markdown('<h3 class="stSubheader">🗑️ Waste</h3>', unsafe_allow_html=True)
         waste_types = {
-            "Organic": st.slider("Weekly organic waste (kg)", 0.0, 20.0, 2.0),
-            "Plastic": st.slider("Weekly plastic waste (kg)", 0.0, 10.0, 1.0),
-            "Paper": st.slider("Weekly paper waste (kg)", 0.0, 10.0, 1.0),
-            "Metal": st.slider("Weekly metal waste (kg)", 0.0, 5.0, 0.5)
+            waste_type: st.slider(*sliders[waste_type], key=f"waste_{waste_type}")
+            for waste_type in emissions.WASTE_TYPES
         }
         
         # Real-time waste emissions calculation
-        waste_emissions = sum(waste * 52 * EMISSION_FACTORS["India"][waste_type] 
-                            for waste_type, waste in waste_types.items())
-        st.session_state.waste_emissions = waste_emissions
+        graph.set_input('waste_amounts', waste_types)
+        st.session_state.waste_emissions = graph.get('waste')
         
         # Show waste emissions preview
         st.markdown(f"""
             <div class="emission-preview">
-                <p>Estimated waste emissions: {waste_emissions/1000:.1f} t CO2/year</p>
+                <p>Estimated waste emissions: {graph.get('waste_preview')} t CO2/year</p>
             </div>
         """, unsafe_allow_html=True)
         
         st.markdown('<h3 class="stSubheader">🍽️ Diet</h3>', unsafe_allow_html=True)
         diet_type = st.selectbox(
             "Select your diet type",
-            ["Vegan", "Vegetarian", "Non-vegetarian"]
+            emissions.DIET_TYPES,
+            key="diet_type"
         )
-        meals_per_day = st.slider("Number of meals per day", 1, 5, 3)
+        meals_per_day = st.slider(*sliders["meals"], key="meals_per_day")
         
         # Real-time diet emissions calculation
-        diet_emissions = meals_per_day * 365 * EMISSION_FACTORS["India"][diet_type]
-        st.session_state.diet_emissions = diet_emissions
+        diet_code = emissions.DIET_TYPES.index(diet_type)
+        graph.set_input('diet_code', diet_code)
+        graph.set_input('meals_per_day', meals_per_day)
+        st.session_state.diet_emissions = graph.get('diet')
         
         # Show diet emissions preview
         st.markdown(f"""
             <div class="emission-preview">
-                <p>Estimated diet emissions: {diet_emissions/1000:.1f} t CO2/year</p>
+                <p>Estimated diet emissions: {graph.get('diet_preview')} t CO2/year</p>
             </div>
         """, unsafe_allow_html=True)
 
-    # Add CSS for emission previews
-    st.markdown("""
-        <style>
-        .emission-preview {
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 10px;
-            padding: 10px;
-            margin: 10px 0;
-            text-align: center;
-            transition: all 0.3s ease;
-        }
-        
-        .emission-preview:hover {
-            background: rgba(255, 255, 255, 0.15);
-            transform: translateY(-2px);
-        }
-        
-        .emission-preview p {
-            margin: 0;
-            font-size: 1rem;
-            color: #4a90e2;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-
         # Calculate total emissions
-    total_emissions = (st.session_state.transport_emissions + 
-                      st.session_state.energy_emissions + 
-                      st.session_state.waste_emissions + 
-                      st.session_state.diet_emissions)
+    total_emissions = graph.get('total')
 
     # Show real-time total emissions
     st.markdown(f"""
         <div class="total-emissions">
-            <h3>Current Total Emissions: {total_emissions/1000:.1f} t CO2/year</h3>
+            <h3>Current Total Emissions: {graph.get('total_preview')} t CO2/year</h3>
         </div>
     """, unsafe_allow_html=True)
 
-    # Add CSS for total emissions
-    st.markdown("""
-        <style>
-        .total-emissions {
-            background: rgba(74, 144, 226, 0.2);
-            border-radius: 15px;
-            padding: 20px;
-            margin: 20px 0;
-            text-align: center;
-            border: 2px solid rgba(74, 144, 226, 0.3);
-        }
-        
-        .total-emissions h3 {
-            margin: 0;
-            color: #4a90e2;
-            font-size: 1.5rem;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-
     # Calculate button with animation
     if st.button("Calculate Final Carbon Footprint", key="calculate_button"):
         # Store results in session state
@@ -666,20 +303,31 @@ with tab1:
             "diet": st.session_state.diet_emissions
         }
         
+        # 90% interval per category from sampled emission factors
+        quantities = emissions.activity_quantities(
+            distance, transport_mode, electricity, fuel_code,
+            [[waste_types[waste_type] for waste_type in emissions.WASTE_TYPES]],
+            meals_per_day, diet_code, flights, fuel_consumption
+        )
+        bands = uncertainty.uncertainty_bands(quantities, region, factor_store)
+        st.session_state.uncertainty_bands = {
+            category: (float(values[0, 0]), float(values[0, -1])) for category, values in bands.items()
+        }
+        
         # Award certificates based on achievements
         if not st.session_state.certificate_progress['Green Novice']['earned']:
             st.session_state.certificate_progress['Green Novice']['earned'] = True
             st.session_state.certificate_progress['Green Novice']['progress'] = 1
         
-        if total_emissions/1000 < 4.79:  # Below global average
+        if total_emissions/1000 < global_average:  # Below global average
             st.session_state.certificate_progress['Eco Warrior']['earned'] = True
             st.session_state.certificate_progress['Eco Warrior']['progress'] = 1
         
-        if total_emissions/1000 < 1.9:  # Below India average
+        if total_emissions/1000 < national_average:  # Below national average
             st.session_state.certificate_progress['Climate Champion']['earned'] = True
             st.session_state.certificate_progress['Climate Champion']['progress'] = 1
         
-        if total_emissions/1000 < 1.0:  # Very low emissions
+        if total_emissions/1000 < emissions.EARTH_GUARDIAN_LIMIT:  # Very low emissions
             st.session_state.certificate_progress['Earth Guardian']['earned'] = True
             st.session_state.certificate_progress['Earth Guardian']['progress'] = 1
         
@@ -696,7 +344,7 @@ with tab1:
                 st.session_state.diet_emissions/1000
             ]
         }
-        st.session_state.emissions_data = pd.DataFrame(emissions_data)
+        st.session_state.emissions_data = emissions_data
         
         st.rerun()
 
@@ -708,12 +356,20 @@ with tab1:
 
         with col3:
             st.markdown('<h3 class="stSubheader">Carbon Emissions by Category</h3>', unsafe_allow_html=True)
+            bands = st.session_state.get('uncertainty_bands') or {}
+            
+            def band(category):
+                if category not in bands:
+                    return ''
+                low, high = bands[category]
+                return f' ({low/1000:.2f}–{high/1000:.2f})'
+            
             st.markdown(f"""
                 <div class="stMarkdown">
-                    <p>🚗 Transportation: {st.session_state.calculation_results['transport']/1000:.2f} t CO2 per year</p>
-                    <p>💡 Energy: {st.session_state.calculation_results['energy']/1000:.2f} t CO2 per year</p>
-                    <p>🍽 Diet: {st.session_state.calculation_results['diet']/1000:.2f} t CO2 per year</p>
-                    <p>🗑 Waste: {st.session_state.calculation_results['waste']/1000:.2f} t CO2 per year</p>
+                    <p>🚗 Transportation: {st.session_state.calculation_results['transport']/1000:.2f} t CO2 per year{band('transport')}</p>
+                    <p>💡 Energy: {st.session_state.calculation_results['energy']/1000:.2f} t CO2 per year{band('energy')}</p>
+                    <p>🍽 Diet: {st.session_state.calculation_results['diet']/1000:.2f} t CO2 per year{band('diet')}</p>
+                    <p>🗑 Waste: {st.session_state.calculation_results['waste']/1000:.2f} t CO2 per year{band('waste')}</p>
                 </div>
             """, unsafe_allow_html=True)
 
@@ -722,18 +378,16 @@ with tab1:
             st.markdown(f"""
                 <div class="stMarkdown">
                     <p>🌍 Your total carbon footprint is: {st.session_state.calculation_results['total']/1000:.2f} t CO2 per year</p>
+                    {f"<p>90% confidence interval:{band('total')} t CO2 per year</p>" if 'total' in bands else ''}
                 </div>
             """, unsafe_allow_html=True)
             
             # Add comparison with global average
-            global_average = 4.79  # Global average CO2 emissions per capita in 2021 (in tonnes)
-            india_average = 1.9    # India's average CO2 emissions per capita in 2021 (in tonnes)
-            
             st.markdown('<h3 class="stSubheader">📈 Comparison with Averages</h3>', unsafe_allow_html=True)
             st.markdown(f"""
                 <div class="stMarkdown">
                     <p>🌐 Global Average: {global_average} t CO2 per capita</p>
-                    <p>🇮🇳 India Average: {india_average} t CO2 per capita</p>
+                    <p>🏳️ {region} Average: {national_average} t CO2 per capita</p>
                 </div>
             """, unsafe_allow_html=True)
             
@@ -745,12 +399,49 @@ with tab1:
                 </div>
             """, unsafe_allow_html=True)
 
-with tab2:
+        # What-if explorer, answered from the precomputed slider surfaces
+        with st.expander("🔍 What if I cut back?"):
+            what_if_options = {
+                "Daily commute distance": ("distance", distance, transport_mode),
+                "Monthly electricity": ("electricity", electricity, 0),
+                "Monthly cooking fuel": ("fuel", fuel_consumption, fuel_code),
+                "Meals per day": ("meals", meals_per_day, diet_code),
+                **{f"Weekly {waste_type.lower()} waste": (waste_type, amount, 0)
+                   for waste_type, amount in waste_types.items()},
+            }
+            what_if_choice = st.selectbox("Input to change", list(what_if_options), key="what_if_input")
+            what_if_cut = st.slider("Reduce it by (%)", 0, 100, 20, 5, key="what_if_cut")
+            slider_name, current_value, option = what_if_options[what_if_choice]
+            saving = surfaces.what_if(slider_name, current_value, what_if_cut / 100, option)
+            st.markdown(f"""
+                <div class="emission-preview">
+                    <p>Cutting {what_if_choice.lower()} by {what_if_cut}% saves {saving/1000:.2f} t CO2/year</p>
+                </div>
+            """, unsafe_allow_html=True)
+            
+            # Sensitivity curve over the whole slider range, thinned for charting;
+            # pandas is only needed here, so it loads on first use
+            import pandas as pd
+            grid, curve = surfaces.curve(slider_name, option)
+            stride = max(1, len(grid) // 200)
+            st.line_chart(
+                pd.DataFrame({'kg CO2/year': curve[::stride]}, index=pd.Index(grid[::stride], name=what_if_choice))
+            )
+
+def dashboard_section():
     st.markdown('<h2 class="stHeader">📈 Carbon Footprint Dashboard</h2>', unsafe_allow_html=True)
     
     # Create three columns for key metrics
     metric_col1, metric_col2, metric_col3 = st.columns(3)
     
+    graph = st.session_state.calc_graph
+    graph.set_input('result_total', st.session_state.calculation_results['total']/1000 if st.session_state.calculation_results else None)
+    graph.set_input('global_average', global_average)
+    below_average = graph.get('status')
+    # 'highest' reads the Calculate inputs, which exist once a calculation has
+    if st.session_state.calculation_results:
+        highest_category, highest_emissions = graph.get('highest')
+    
     with metric_col1:
             st.markdown("""
             <div class="metric-card">
@@ -764,7 +455,7 @@ with tab2:
                     </div>
         """.format(
             st.session_state.calculation_results['total']/1000 if st.session_state.calculation_results else 0,
-            (st.session_state.calculation_results['total']/1000 / 4.79 * 100) if st.session_state.calculation_results else 0
+            (st.session_state.calculation_results['total']/1000 / global_average * 100) if st.session_state.calculation_results else 0
         ), unsafe_allow_html=True)
 
     with metric_col2:
@@ -779,19 +470,8 @@ with tab2:
                         </div>
                     </div>
         """.format(
-            max(
-                ('Transportation', st.session_state.transport_emissions),
-                ('Energy', st.session_state.energy_emissions),
-                ('Waste', st.session_state.waste_emissions),
-                ('Diet', st.session_state.diet_emissions),
-                key=lambda x: x[1]
-            )[0] if st.session_state.calculation_results else 'N/A',
-            max(
-                st.session_state.transport_emissions,
-                st.session_state.energy_emissions,
-                st.session_state.waste_emissions,
-                st.session_state.diet_emissions
-            ) / st.session_state.calculation_results['total'] * 100 if st.session_state.calculation_results else 0
+            highest_category if st.session_state.calculation_results else 'N/A',
+            highest_emissions / st.session_state.calculation_results['total'] * 100 if st.session_state.calculation_results else 0
         ), unsafe_allow_html=True)
 
     with metric_col3:
@@ -806,8 +486,8 @@ with tab2:
                         </div>
                     </div>
         """.format(
-            'good' if st.session_state.calculation_results and st.session_state.calculation_results['total']/1000 < 4.79 else 'bad',
-            'Below Average' if st.session_state.calculation_results and st.session_state.calculation_results['total']/1000 < 4.79 else 'Above Average'
+            'good' if below_average else 'bad',
+            'Below Average' if below_average else 'Above Average'
         ), unsafe_allow_html=True)
 
     # Add trends section
@@ -816,90 +496,16 @@ with tab2:
     # Create three columns with adjusted widths
     chart_col1, chart_col2, chart_col3 = st.columns([1.2, 1.2, 1])
     
-    with chart_col1:
-        if st.session_state.emissions_data is not None:
-            # Category breakdown bar chart
-            fig1 = px.bar(
-                st.session_state.emissions_data,
-                x='Category',
-                y='Emissions (t CO2)',
-                title='Emissions by Category',
-                color='Category',
-                color_discrete_sequence=['#3498db', '#2ecc71', '#e74c3c', '#f1c40f']
-            )
-            fig1.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white', size=12),
-                title_font_size=16,
-                height=300,  # Reduced height
-                margin=dict(t=30, b=20, l=20, r=20),
-                showlegend=False,
-                xaxis=dict(title=''),
-                yaxis=dict(title='t CO2/year')
-            )
-            st.plotly_chart(fig1, use_container_width=True)
-    
-    with chart_col2:
-        if st.session_state.emissions_data is not None:
-            # Pie chart with adjusted layout
-            fig_pie = px.pie(
-                st.session_state.emissions_data, 
-                values='Emissions (t CO2)', 
-                names='Category',
-                title='Distribution of Emissions',
-                color_discrete_sequence=['#3498db', '#2ecc71', '#e74c3c', '#f1c40f']
-            )
-            fig_pie.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white', size=12),
-                title_font_size=16,
-                height=300,  # Reduced height
-                margin=dict(t=30, b=20, l=20, r=20),
-                showlegend=True,
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=-0.2,
-                    xanchor="center",
-                    x=0.5,
-                    font=dict(color='white', size=11)
-                )
-            )
-            st.plotly_chart(fig_pie, use_container_width=True)
-    
-    with chart_col3:
-        if st.session_state.emissions_data is not None:
-            # Comparison with benchmarks
-            comparison_data = pd.DataFrame({
-                'Source': ['Your Emissions', 'Global Average', 'India Average'],
-                'Emissions': [
-                    st.session_state.calculation_results['total']/1000,
-                    4.79,  # Global average
-                    1.9    # India average
-                ]
-            })
-            fig2 = px.bar(
-                comparison_data,
-                x='Source',
-                y='Emissions',
-                title='Emissions Comparison',
-                color='Source',
-                color_discrete_sequence=['#76c7c0', '#666666', '#888888']
-            )
-            fig2.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white', size=12),
-                title_font_size=16,
-                height=300,  # Reduced height
-                margin=dict(t=30, b=20, l=20, r=20),
-                showlegend=False,
-                xaxis=dict(title='', tickangle=45),
-                yaxis=dict(title='t CO2/year')
-            )
-            st.plotly_chart(fig2, use_container_width=True)
+    if st.session_state.emissions_data is not None:
+        # Figures come pre-serialized from a cache shared by all sessions
+        charts = figures.dashboard_figures(
+            figures.results_key(st.session_state.calculation_results),
+            region, global_average, national_average,
+            st.get_option('theme.base') or 'dark'
+        )
+        for chart_col, chart in zip([chart_col1, chart_col2, chart_col3], charts):
+            with chart_col:
+                st.plotly_chart(json.loads(chart), use_container_width=True)
 
     # Add recommendations section
     st.markdown('<h3 class="stSubheader">Personalized Recommendations</h3>', unsafe_allow_html=True)
@@ -944,7 +550,7 @@ with tab2:
                     </div>
                 """, unsafe_allow_html=True)
             
-with tab3:
+def offset_section():
     st.markdown('<h2 class="stHeader">🌱 Carbon Offset Options</h2>', unsafe_allow_html=True)
     
     if st.session_state.calculation_results:
@@ -986,127 +592,106 @@ with tab3:
     else:
         st.info("Please calculate your carbon footprint first in the Calculate tab.")
 
-with tab4:
+def ask_chatbot(question):
+    st.session_state.chat_history.add_question(question)
+    # Answered while the fragment renders, so it can stream onto the page
+    st.session_state.pending_question = question
+    st.session_state.chat_window = chat_history.PAGE_SIZE
+
+def stream_answer(question):
+    session_id = st.session_state.setdefault('chat_session_id', uuid.uuid4().hex)
+    try:
+        yield from get_chat_service().stream(session_id, question)
+    except chat_service.ChatTimeout:
+        yield "\n\n⏱️ *The assistant took too long to answer; please try again.*"
+
+def submit_chat_input():
+    user_input = st.session_state.chat_input
+    st.session_state.chat_input = ""
+    if user_input:
+        ask_chatbot(user_input)
+
+def clear_chat():
+    st.session_state.chat_history.clear()
+    st.session_state.pending_question = None
+    st.session_state.chat_window = chat_history.PAGE_SIZE
+
+def load_older_messages():
+    st.session_state.chat_window += chat_history.PAGE_SIZE
+
+# The chat, the weekly challenge card and the certificate grid are
+# fragments: their widgets rerun only their own function instead of the
+# whole script (calculator, charts and all)
+@st.fragment
+@perf.timed("chat fragment")
+def chat_section():
     st.markdown('<h2 class="stHeader">💬 Chat with Eco Assistant</h2>', unsafe_allow_html=True)
     
     # Initialize chat history if not exists
     if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
-    if 'message_counter' not in st.session_state:
-        st.session_state.message_counter = 0
-    
-    # Display chat history
-    for message in st.session_state.chat_history:
-        with st.container():
-            message_class = 'user' if message['is_user'] else 'bot'
-            st.markdown(f"""
-                <div class="stMarkdown">
-                    <div style='display: flex; align-items: center; margin-bottom: 0.5rem;'>
-                        <span style='font-size: 1.2rem; margin-right: 0.5rem;'>
-                            {'👤' if message['is_user'] else '🌱'}
-                        </span>
-                        <strong style='color: {'#4CAF50' if message['is_user'] else '#2196F3'};'>
-                            {'You' if message['is_user'] else 'Assistant'}
-                        </strong>
-                    </div>
-                    <div style='padding: 1rem; background-color: #2D2D2D; border-radius: 10px;'>
-                        {message['content']}
-                    </div>
-                </div>
-            """, unsafe_allow_html=True)
-    
+        st.session_state.chat_history = chat_history.ChatHistory()
+    if 'chat_window' not in st.session_state:
+        st.session_state.chat_window = chat_history.PAGE_SIZE
+
+    # Only the newest messages are drawn; older ones a page at a time
+    history = st.session_state.chat_history
+    if len(history) > st.session_state.chat_window:
+        st.button("⬆️ Load older messages", on_click=load_older_messages)
+    for message in history.window(st.session_state.chat_window):
+        author = ('user', '👤', 'You') if message.is_user else ('bot', '🌱', 'Assistant')
+        st.markdown(f"""
+            <div class="chat-author {author[0]}"><span>{author[1]}</span><strong>{author[2]}</strong></div>
+            <div class="chat-bubble">{message.content}</div>
+        """, unsafe_allow_html=True)
+
+    question = st.session_state.get('pending_question')
+    if question:
+        st.markdown("**🌱 Assistant**")
+        response = st.write_stream(stream_answer(question))
+        st.session_state.pending_question = None
+        # Only a complete canonical answer is shared through the answer
+        # table; partial or generated text stays in this session's history
+        routed = chatbot.route(question)
+        history.add_answer(response, routed.source if response == routed.text else None)
+
     # Display suggestions if no chat history
-    if not st.session_state.chat_history:
+    if not history:
         st.subheader("Suggested Questions:")
         suggestions = chatbot.get_suggestions()
         cols = st.columns(2)
         for i, suggestion in enumerate(suggestions):
             with cols[i % 2]:
-                if st.button(suggestion, key=f"suggestion_{i}", use_container_width=True):
-                    st.session_state.chat_history.append({
-                        'is_user': True,
-                        'content': suggestion
-                    })
-                    response = chatbot.get_response(suggestion)
-                    st.session_state.chat_history.append({
-                        'is_user': False,
-                        'content': response
-                    })
-                    st.session_state.message_counter += 1
-                    st.rerun()
+                st.button(suggestion, key=f"suggestion_{i}", use_container_width=True,
+                          on_click=ask_chatbot, args=(suggestion,))
     
     # Add a clear chat button
-    if st.button("🗑️ Clear Chat"):
-        st.session_state.chat_history = []
-        st.session_state.message_counter = 0
-        st.rerun()
+    st.button("🗑️ Clear Chat", on_click=clear_chat)
     
-    # Chat input
-    user_input = st.text_input(
+    # Chat input; like the buttons above it is handled in a callback, so
+    # the question is answered once and the fragment redraws with it
+    st.text_input(
         "Ask a question:",
-        placeholder="Type your question here..."
+        placeholder="Type your question here...",
+        key="chat_input",
+        on_change=submit_chat_input
     )
-    
-    # Handle user input
-    if user_input:
-        if st.session_state.message_counter < 10:  # Limit the number of messages
-            # Add user message
-            st.session_state.chat_history.append({
-                'is_user': True,
-                'content': user_input
-            })
-            
-            # Get and add bot response
-            response = chatbot.get_response(user_input)
-            st.session_state.chat_history.append({
-                'is_user': False,
-                'content': response
-            })
-            
-            # Increment message counter
-            st.session_state.message_counter += 1
-            
-            # Rerun to update the display
-            st.rerun()
-        else:
-            st.warning("You've reached the maximum number of messages. Please clear the chat to continue.")
 
-with tab5:
-    st.markdown('<h2 class="stHeader">🎮 Carbon Footprint Challenges</h2>', unsafe_allow_html=True)
-    
-    # Create columns for the reset buttons at the top
-    reset_col1, reset_col2, reset_col3 = st.columns([1, 1, 1])
-    with reset_col1:
-        if st.button("🔄 Reset Weekly Challenge", key="reset_weekly"):
-            st.session_state.weekly_challenge['progress'] = 0
-            save_progress()
-            st.rerun()
-    
-    with reset_col2:
-        if st.button("🔄 Reset All Progress", key="reset_progress"):
-            st.session_state.certificate_progress = {
-                'Green Novice': {'earned': False, 'progress': 0},
-                'Eco Warrior': {'earned': False, 'progress': 0},
-                'Climate Champion': {'earned': False, 'progress': 0},
-                'Earth Guardian': {'earned': False, 'progress': 0}
-            }
-            st.session_state.challenges = []
-            st.session_state.achievements = []
-            st.session_state.carbon_journey = []
-            st.session_state.weekly_challenge['progress'] = 0
-            save_progress()
-            st.rerun()
-
-    st.markdown("<br>", unsafe_allow_html=True)
-    st.markdown('<h3 class="stSubheader">Weekly Challenge</h3>', unsafe_allow_html=True)
-    
-    if st.button("Mark Day as Complete", key="challenge_button"):
-        st.session_state.weekly_challenge['progress'] += 1
-        if st.session_state.weekly_challenge['progress'] >= st.session_state.weekly_challenge['days']:
-            st.session_state.certificate_progress['Eco Warrior']['progress'] += 1
-            if st.session_state.certificate_progress['Eco Warrior']['progress'] >= 3:
-                st.session_state.certificate_progress['Eco Warrior']['earned'] = True
-        save_progress()
+def complete_challenge_day():
+    st.session_state.weekly_challenge['progress'] += 1
+    if st.session_state.weekly_challenge['progress'] >= st.session_state.weekly_challenge['days']:
+        st.session_state.certificate_progress['Eco Warrior']['progress'] += 1
+        if st.session_state.certificate_progress['Eco Warrior']['progress'] >= 3:
+            if not st.session_state.certificate_progress['Eco Warrior']['earned']:
+                st.session_state.certificate_earned = True
+            st.session_state.certificate_progress['Eco Warrior']['earned'] = True
+    save_progress()
+
+@st.fragment
+@perf.timed("weekly challenge fragment")
+def weekly_challenge_card():
+    st.button("Mark Day as Complete", key="challenge_button", on_click=complete_challenge_day)
+    if st.session_state.pop('certificate_earned', False):
+        # A newly earned certificate changes the grid outside this fragment
         st.rerun()
 
     st.markdown(f"""
@@ -1121,28 +706,9 @@ with tab5:
 </div>
 """, unsafe_allow_html=True)
 
-    st.markdown('<h3 class="stSubheader">🏆 Your Achievements</h3>', unsafe_allow_html=True)
-    achievements = [
-        {'name': '🌱 Green Starter', 'description': 'First carbon footprint calculation', 'icon': '🌱'},
-        {'name': '🚶‍♂️ Eco Walker', 'description': 'Walked/cycled 10km', 'icon': '🚶‍♂️'},
-        {'name': '💡 Energy Saver', 'description': 'Reduced energy consumption by 20%', 'icon': '💡'},
-        {'name': '♻️ Recycling Master', 'description': 'Properly sorted waste for 1 month', 'icon': '♻️'}
-    ]
-    
-    cols = st.columns(4)
-    for i, achievement in enumerate(achievements):
-        with cols[i]:
-            st.markdown(f"""
-<div class="achievement-card">
-    <div class="achievement-icon">{achievement['icon']}</div>
-    <h4>{achievement['name']}</h4>
-    <p>{achievement['description']}</p>
-</div>
-""", unsafe_allow_html=True)
-
-    # Certificates Section
-    st.markdown('<h3 class="stSubheader">🏆 Certificates</h3>', unsafe_allow_html=True)
-    
+@st.fragment
+@perf.timed("certificate grid fragment")
+def certificate_grid():
     # Create a grid layout for certificates
     cert_col1, cert_col2 = st.columns(2)
     
@@ -1157,13 +723,13 @@ with tab5:
         'Eco Warrior': {
             'icon': '⚔️',
             'description': 'Keep emissions below global average or complete weekly challenges',
-            'requirements': ['Emissions below 4.79 tonnes CO2/year', 'OR Complete 7 daily challenges'],
+            'requirements': [f'Emissions below {global_average} tonnes CO2/year', 'OR Complete 7 daily challenges'],
             'color': '#2196F3'
         },
         'Climate Champion': {
             'icon': '🏆',
-            'description': 'Maintain emissions below India\'s average',
-            'requirements': ['Emissions below 1.9 tonnes CO2/year'],
+            'description': f'Maintain emissions below {region}\'s average',
+            'requirements': [f'Emissions below {national_average} tonnes CO2/year'],
             'color': '#FFC107'
         },
         'Earth Guardian': {
@@ -1239,7 +805,99 @@ with tab5:
                         'description': cert_data['description'],
                         'requirements': cert_data['requirements']
                     }
-                    st.rerun()
+                    # The certificate modal is drawn outside the fragment
+                    st.rerun(scope="app")
+
+def challenges_section():
+    st.markdown('<h2 class="stHeader">🎮 Carbon Footprint Challenges</h2>', unsafe_allow_html=True)
+    
+    # Create columns for the reset buttons at the top
+    reset_col1, reset_col2, reset_col3 = st.columns([1, 1, 1])
+    with reset_col1:
+        if st.button("🔄 Reset Weekly Challenge", key="reset_weekly"):
+            st.session_state.weekly_challenge['progress'] = 0
+            save_progress()
+            st.rerun()
+    
+    with reset_col2:
+        if st.button("🔄 Reset All Progress", key="reset_progress"):
+            st.session_state.certificate_progress = {
+                'Green Novice': {'earned': False, 'progress': 0},
+                'Eco Warrior': {'earned': False, 'progress': 0},
+                'Climate Champion': {'earned': False, 'progress': 0},
+                'Earth Guardian': {'earned': False, 'progress': 0}
+            }
+            st.session_state.challenges = []
+            st.session_state.achievements = []
+            st.session_state.carbon_journey = []
+            st.session_state.weekly_challenge['progress'] = 0
+            save_progress()
+            st.rerun()
+
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown('<h3 class="stSubheader">Weekly Challenge</h3>', unsafe_allow_html=True)
+    
+    weekly_challenge_card()
+
+    st.markdown('<h3 class="stSubheader">🏆 Your Achievements</h3>', unsafe_allow_html=True)
+    achievements = [
+        {'name': '🌱 Green Starter', 'description': 'First carbon footprint calculation', 'icon': '🌱'},
+        {'name': '🚶‍♂️ Eco Walker', 'description': 'Walked/cycled 10km', 'icon': '🚶‍♂️'},
+        {'name': '💡 Energy Saver', 'description': 'Reduced energy consumption by 20%', 'icon': '💡'},
+        {'name': '♻️ Recycling Master', 'description': 'Properly sorted waste for 1 month', 'icon': '♻️'}
+    ]
+    
+    cols = st.columns(4)
+    for i, achievement in enumerate(achievements):
+        with cols[i]:
+            st.markdown(f"""
+<div class="achievement-card">
+    <div class="achievement-icon">{achievement['icon']}</div>
+    <h4>{achievement['name']}</h4>
+    <p>{achievement['description']}</p>
+</div>
+""", unsafe_allow_html=True)
+
+    # Certificates Section
+    st.markdown('<h3 class="stSubheader">🏆 Certificates</h3>', unsafe_allow_html=True)
+    
+    certificate_grid()
+
+SECTIONS = {
+    "📊 Calculate": calculate_section,
+    "📈 Dashboard": dashboard_section,
+    "🌱 Offset": offset_section,
+    "💬 Chat": chat_section,
+    "🎮 Challenges": challenges_section,
+}
+
+# Keyed widgets per section. Streamlit drops the state of widgets that were
+# not drawn in a run, so the hidden sections' values are written back to
+# session state to keep them until the section is shown again.
+SECTION_WIDGET_KEYS = {
+    "📊 Calculate": ["region", "transport_type", "distance", "flights", "electricity",
+                    "cooking_fuel", "fuel_consumption", "diet_type", "meals_per_day",
+                    "what_if_input", "what_if_cut",
+                    *[f"waste_{waste_type}" for waste_type in emissions.WASTE_TYPES]],
+    "💬 Chat": ["chat_input"],
+}
+
+# NAVIGATION_MODE=tabs restores st.tabs, which runs all five sections on
+# every rerun; the default runs only the selected one
+if os.getenv("NAVIGATION_MODE", "sections") == "tabs":
+    for tab, render_section in zip(st.tabs(list(SECTIONS)), SECTIONS.values()):
+        with tab:
+            render_section()
+else:
+    active_section = st.radio("Section", list(SECTIONS), horizontal=True,
+                              key="active_section", label_visibility="collapsed")
+    for section, keys in SECTION_WIDGET_KEYS.items():
+        if section == active_section:
+            continue
+        for key in keys:
+            if key in st.session_state:
+                st.session_state[key] = st.session_state[key]
+    SECTIONS[active_section]()
 
 # Add interactive tips section
 with st.expander("💡 Interactive Tips"):
@@ -1310,3 +968,19 @@ if st.session_state.show_certificate:
         });
         </script>
     """, unsafe_allow_html=True)
+
+# Incremental recompute stats for this rerun
+graph = st.session_state.calc_graph
+st.sidebar.caption(
+    f"♻️ Recomputed {graph.computed} of {graph.node_count} values this rerun ({graph.skipped} skipped)"
+)
+
+# Rerun timings: full script runs versus the fragments that replace them
+perf.record("full rerun", time.perf_counter() - rerun_start)
+with st.sidebar.expander("⏱️ Rerun timings"):
+    for row in perf.summary():
+        st.caption(f"{row['label']}: {row['mean_ms']:.0f} ms mean, "
+                   f"{row['last_ms']:.0f} ms last ({row['runs']} runs)")
+    cache_stats = chatbot.cache.stats()
+    st.caption(f"Chat answers cached: {cache_stats['size']} ({cache_stats['hits']} hits, "
+               f"{cache_stats['misses']} misses, {cache_stats['evictions']} evictions)")
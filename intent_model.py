@@ -0,0 +1,250 @@
+"""Chat intent classifier trained offline from labeled queries.
+
+A multinomial naive Bayes model over hashed word stems. Training
+(`python intent_model.py train intent_queries.tsv intent_model.bin`)
+writes one flat float32 matrix (see flat_file.py): a row of per-topic log
+weights for every feature bucket, plus the topic priors. Server processes
+memory-map the file read-only, so they share one copy of it, and a batch
+of queries is scored with a single gather over that matrix.
+
+`python intent_model.py evaluate intent_queries.tsv` cross-validates the
+model against keyword routing and times both.
+"""
+import hashlib
+import logging
+import os
+import sys
+import zlib
+from itertools import chain
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import flat_file
+from retrieval import STOP_WORDS, stem
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CFINTENT"
+N_FEATURES = 1 << 14
+ALPHA = 0.5  # Additive smoothing of feature counts
+
+# Words that say nothing about the topic; with few examples per topic the
+# model would otherwise route on "is ... worse than" rather than the subject
+FEATURE_STOP_WORDS = STOP_WORDS | frozenset("""
+about bad better emission emissions good is less more much please really
+reduce should than tips too very vs way what worse worth
+""".split())
+
+# Each chatbot keyword counts as this many labeled examples of its topic
+KEYWORD_WEIGHT = 5
+
+MODEL_PATH = os.environ.get(
+    "INTENT_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_model.bin"),
+)
+TRAINING_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_queries.tsv")
+
+
+def features(text: str, n_features: int = N_FEATURES) -> List[int]:
+    """Distinct feature buckets of `text`: the stems of its words, hashed
+    into `n_features` (a power of two)."""
+    mask = n_features - 1
+    return sorted({zlib.crc32(stem(word).encode("utf-8")) & mask
+                   for word in text.lower().split() if word not in FEATURE_STOP_WORDS})
+
+
+class IntentModel:
+    """Immutable classifier over a (bucket x topic) log-weight matrix.
+
+    Queries are expected in the form the training text was given in (the
+    chatbot passes normalized queries to both).
+    """
+
+    def __init__(self, topics: Sequence[str], matrix: np.ndarray, digest: str = ""):
+        self.topics = tuple(topics)
+        # Rows: one per feature bucket, then the topic priors. Columns: one
+        # per topic, then 1.0 for buckets seen in training
+        self.matrix = matrix
+        self.n_features = matrix.shape[0] - 1
+        self.digest = digest
+        self._weights = matrix[:self.n_features, :len(self.topics)]
+        self._seen = matrix[:self.n_features, len(self.topics)]
+        self._priors = np.asarray(matrix[self.n_features, :len(self.topics)])
+
+    @classmethod
+    def train(cls, examples: Sequence[Tuple[str, str]], n_features: int = N_FEATURES,
+              alpha: float = ALPHA) -> "IntentModel":
+        """Fit on (topic, query) pairs; topics are ordered by first appearance."""
+        if n_features & (n_features - 1):
+            raise ValueError(f"n_features must be a power of two, got {n_features}")
+        topics = list(dict.fromkeys(topic for topic, _ in examples))
+        counts = np.zeros((n_features, len(topics)))
+        totals = np.zeros(len(topics))
+        for topic, text in examples:
+            counts[features(text, n_features), topics.index(topic)] += 1
+            totals[topics.index(topic)] += 1
+
+        matrix = np.zeros((n_features + 1, len(topics) + 1), dtype="<f4")
+        matrix[:n_features, :-1] = np.log((counts + alpha) / (counts.sum(axis=0) + alpha * n_features))
+        matrix[:n_features, -1] = counts.sum(axis=1) > 0
+        matrix[n_features, :-1] = np.log(totals / totals.sum())
+        digest = hashlib.sha1(repr(sorted(examples)).encode("utf-8")).hexdigest()
+        return cls(topics, matrix, digest)
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH) -> "IntentModel":
+        """Memory-map a model written by `save`."""
+        header, offset = flat_file.read_header(path, MAGIC, "an intent model")
+        shape = (header["n_features"] + 1, len(header["topics"]) + 1)
+        matrix = np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=shape)
+        return cls(header["topics"], matrix, header["digest"])
+
+    def save(self, path: str):
+        """Write the model as a header plus one float32 matrix, ready to memory-map."""
+        flat_file.write(path, MAGIC, {"topics": self.topics, "n_features": self.n_features,
+                                      "digest": self.digest}, self.matrix, "<f4")
+
+    def classify_batch(self, queries: Sequence[str]) -> List[Optional[Tuple[str, float]]]:
+        """(topic, probability) for each query, or None for queries with no
+        feature seen in training."""
+        rows = [features(query, self.n_features) for query in queries]
+        buckets = np.fromiter(chain.from_iterable(rows), dtype=np.intp)
+        query_ids = np.repeat(np.arange(len(rows)), [len(row) for row in rows])
+        # Unseen buckets carry only smoothing, which would favor small topics
+        seen = self._seen[buckets] > 0
+        buckets, query_ids = buckets[seen], query_ids[seen]
+
+        scores = np.tile(self._priors, (len(rows), 1))
+        np.add.at(scores, query_ids, self._weights[buckets])
+        known = np.bincount(query_ids, minlength=len(rows)) > 0
+        best = scores.argmax(axis=1)
+        # Posterior of the best topic: 1 / sum(exp(score - best score))
+        confidence = 1.0 / np.exp(scores - scores[np.arange(len(rows)), best, None]).sum(axis=1)
+        return [(self.topics[topic], float(probability)) if is_known else None
+                for topic, probability, is_known in zip(best, confidence, known)]
+
+    def knows(self, word: str) -> bool:
+        """Whether `word` is a stop word or was seen in training."""
+        if word in FEATURE_STOP_WORDS:
+            return True
+        return bool(self._seen[zlib.crc32(stem(word).encode("utf-8")) & (self.n_features - 1)] > 0)
+
+    def classify(self, query: str) -> Optional[Tuple[str, float]]:
+        """`classify_batch` for one query, without the batch bookkeeping."""
+        buckets = np.array(features(query, self.n_features), dtype=np.intp)
+        buckets = buckets[self._seen[buckets] > 0]
+        if not len(buckets):
+            return None
+        scores = self._priors + self._weights[buckets].sum(axis=0)
+        best = scores.argmax()
+        return self.topics[best], float(1.0 / np.exp(scores - scores[best]).sum())
+
+
+def load_default() -> Optional[IntentModel]:
+    """The model at MODEL_PATH, trained from TRAINING_PATH and saved there
+    first if it is missing; None when there is nothing to train it from."""
+    if not os.path.exists(MODEL_PATH):
+        if not os.path.exists(TRAINING_PATH):
+            return None
+        logger.info("Training the intent model from %s into %s", TRAINING_PATH, MODEL_PATH)
+        model = IntentModel.train(training_examples(TRAINING_PATH))
+        try:
+            save_atomically(model, MODEL_PATH)
+        except OSError:
+            logger.warning("Could not save the intent model to %s; using an unshared copy",
+                           MODEL_PATH, exc_info=True)
+            return model
+    return IntentModel.load(MODEL_PATH)
+
+
+def save_atomically(model: IntentModel, path: str):
+    """Save under a temporary name and rename, so processes starting at the
+    same time never memory-map a partly written model."""
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        model.save(temporary)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def read_examples(path: str) -> List[Tuple[str, str]]:
+    """(topic, query) pairs of a tab-separated file; # starts a comment."""
+    examples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                topic, query = line.rstrip("\n").split("\t", 1)
+                examples.append((topic, query))
+    return examples
+
+
+def training_examples(path: str) -> List[Tuple[str, str]]:
+    """Labeled queries plus the chatbot's keywords, normalized like live
+    queries are."""
+    from chatbot import KEYWORDS, RESPONSES, normalize_query
+
+    examples = read_examples(path)
+    examples += [(topic, keyword) for topic, keywords in KEYWORDS.items()
+                 for keyword in keywords] * KEYWORD_WEIGHT
+    unknown = {topic for topic, _ in examples} - set(RESPONSES)
+    if unknown:
+        raise ValueError(f"Topics without a chatbot response: {sorted(unknown)}")
+    return [(topic, normalize_query(query)) for topic, query in examples]
+
+
+def evaluate(path: str, folds: int = 5):
+    import time
+
+    from chatbot import CarbonFootprintChatbot, normalize_query
+
+    labeled = [(topic, normalize_query(query)) for topic, query in read_examples(path)]
+    keywords = training_examples(path)[len(labeled):]
+    keyword_bot = CarbonFootprintChatbot(intent_model=None)
+    correct = {"keywords": 0, "model": 0}
+    for fold in range(folds):
+        held_out = labeled[fold::folds]
+        train = [example for i, example in enumerate(labeled) if i % folds != fold]
+        model = IntentModel.train(train + keywords)
+        predicted = model.classify_batch([query for _, query in held_out])
+        for (topic, query), match in zip(held_out, predicted):
+            correct["model"] += (match[0] if match else "default") == topic
+            correct["keywords"] += (keyword_bot.get_topic(query) or "default") == topic
+    for name, hits in correct.items():
+        print(f"{name:8s} {hits / len(labeled) * 100:5.1f}% of {len(labeled)} held-out queries routed correctly")
+
+    model = IntentModel.train(training_examples(path))
+    queries = [query for _, query in labeled] * 20
+    start = time.perf_counter()
+    for query in queries:
+        keyword_bot.get_topic(query)
+    keyword_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for query in queries:
+        model.classify(query)
+    single_time = time.perf_counter() - start
+    start = time.perf_counter()
+    model.classify_batch(queries)
+    batch_time = time.perf_counter() - start
+    print(f"keywords {keyword_time / len(queries) * 1e6:6.1f} us per query; model "
+          f"{single_time / len(queries) * 1e6:6.1f} us one at a time, "
+          f"{batch_time / len(queries) * 1e6:6.1f} us batched")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) == 3 and argv[0] == "train":
+        model = IntentModel.train(training_examples(argv[1]))
+        save_atomically(model, argv[2])
+        print(f"Wrote a {len(model.topics)}-topic model over {model.n_features} feature buckets to {argv[2]}")
+    elif len(argv) == 2 and argv[0] == "evaluate":
+        evaluate(argv[1])
+    else:
+        sys.exit("usage: python intent_model.py train QUERIES.tsv OUTPUT.bin\n"
+                 "       python intent_model.py evaluate QUERIES.tsv")
+
+
+if __name__ == "__main__":
+    main()
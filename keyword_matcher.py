@@ -0,0 +1,176 @@
+"""Multi-pattern keyword matching for the chatbot (Aho–Corasick).
+
+All keywords of all topics are compiled into one automaton, so a message is
+scanned once no matter how many keywords there are. Matches must start at a
+word boundary and end at one, optionally after a common inflection
+("flights", "commuter"), so "light" no longer matches inside "flight" and
+"hi" no longer matches inside "this". Keywords shorter than
+MIN_INFLECTED_LENGTH match only as written ("hi" + "s" is "his", "car" +
+"es" is "cares"); their inflections are listed as keywords of their own.
+
+`python keyword_matcher.py` checks the chatbot's keywords against messages
+that used to be misrouted.
+"""
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+# Endings a keyword may carry and still count as a whole-word match
+SUFFIXES = frozenset(["s", "es", "ed", "ing", "er", "ers", "ation", "ations"])
+# Extra endings for keywords ending in "e" ("recycle" -> "recycled")
+E_SUFFIXES = frozenset(["d", "r", "rs"])
+# Shorter keywords take no ending
+MIN_INFLECTED_LENGTH = 4
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class Match(NamedTuple):
+    start: int
+    end: int
+    topic: str
+    keyword: str
+
+
+class KeywordMatcher:
+    """Immutable automaton over {topic: keywords}."""
+
+    def __init__(self, keywords: Mapping[str, Sequence[str]]):
+        self.topics = tuple(keywords)
+        patterns: List[Tuple[str, str]] = []
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for topic, words in keywords.items():
+            for word in words:
+                word = normalize(word)
+                node = 0
+                for char in word:
+                    if char not in goto[node]:
+                        goto.append({})
+                        outputs.append([])
+                        goto[node][char] = len(goto) - 1
+                    node = goto[node][char]
+                outputs[node].append(len(patterns))
+                patterns.append((topic, word))
+
+        # Breadth-first failure links; each node also inherits the outputs
+        # of its failure node so matching never walks the failure chain
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(char, 0)
+                outputs[child].extend(outputs[fail[child]])
+
+        self._patterns = tuple(patterns)
+        self._goto = tuple(goto)
+        self._fail = tuple(fail)
+        self._outputs = tuple(tuple(output) for output in outputs)
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def matches(self, text: str) -> Iterator[Match]:
+        """Whole-word keyword matches in `text`, in order of where they end."""
+        text = normalize(text)
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for pattern in outputs[node]:
+                topic, word = self._patterns[pattern]
+                start = position + 1 - len(word)
+                end = _word_end(text, word, position + 1)
+                if end is not None and (start == 0 or not _is_word_char(text[start - 1])):
+                    yield Match(start, end, topic, word)
+
+    def topic_hits(self, text: str) -> Dict[str, Tuple[int, int]]:
+        """topic -> (number of matches, start of the first one)."""
+        hits: Dict[str, Tuple[int, int]] = {}
+        for match in self.matches(text):
+            count, first = hits.get(match.topic, (0, match.start))
+            hits[match.topic] = (count + 1, min(first, match.start))
+        return hits
+
+    def classify(self, text: str, priority: Sequence[str] = ()) -> Optional[Tuple[str, int]]:
+        """(topic, number of its matches) for what `text` is about, or None
+        when no keyword matches.
+
+        Topics in `priority` win in that order whenever they match at all;
+        otherwise the topic with the most matches wins, and ties go to the
+        one mentioned first.
+        """
+        hits = self.topic_hits(text)
+        for topic in priority:
+            if topic in hits:
+                return topic, hits[topic][0]
+        if not hits:
+            return None
+        topic = min(hits, key=lambda topic: (-hits[topic][0], hits[topic][1]))
+        return topic, hits[topic][0]
+
+    def best_topic(self, text: str, priority: Sequence[str] = ()) -> Optional[str]:
+        """The topic `text` is about (see `classify`), or None."""
+        match = self.classify(text, priority)
+        return match[0] if match else None
+
+def normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", text.casefold()).strip()
+
+
+def _is_word_char(char: str) -> bool:
+    # Combining marks (Devanagari vowel signs, accents) are part of the word
+    return char.isalnum() or unicodedata.category(char)[0] == "M"
+
+
+def _word_end(text: str, word: str, end: int) -> Optional[int]:
+    """End of the word that `word` (ending at `end`) begins, if it is `word`
+    itself or `word` plus an allowed suffix; otherwise None."""
+    tail = end
+    while tail < len(text) and _is_word_char(text[tail]):
+        tail += 1
+    suffix = text[end:tail]
+    if not suffix:
+        return tail
+    if len(word) >= MIN_INFLECTED_LENGTH and (suffix in SUFFIXES or (word.endswith("e") and suffix in E_SUFFIXES)):
+        return tail
+    return None
+
+
+# (message, topic the chatbot's keywords should route it to, or None)
+CHECK_MESSAGES = [
+    ("hi there", "greeting"),
+    ("what does his diet do", "diet"),
+    ("is this flight worth it", "transportation"),
+    ("my mom cares about plastic", None),
+    ("carbon offsets", None),
+    ("cars and buses", "transportation"),
+    ("we recycled the boxes", "waste"),
+    ("eating less", "diet"),
+    ("are taps or tapes worse", "water"),
+]
+
+
+def check():
+    """Raise AssertionError unless every CHECK_MESSAGES message routes to
+    its topic."""
+    from chatbot import KEYWORDS, PRIORITY_TOPICS
+
+    matcher = KeywordMatcher(KEYWORDS)
+    wrong = [(message, topic, matcher.best_topic(message, PRIORITY_TOPICS))
+             for message, topic in CHECK_MESSAGES if matcher.best_topic(message, PRIORITY_TOPICS) != topic]
+    if wrong:
+        raise AssertionError("Misrouted (message, expected, routed): " + "; ".join(map(repr, wrong)))
+    print(f"{len(CHECK_MESSAGES)} messages routed as expected")
+
+
+if __name__ == "__main__":
+    check()
@@ -0,0 +1,240 @@
+"""Lightweight rerun timing for the Streamlit app.
+
+Full-script reruns and fragment reruns record their wall time under a
+label in the session, so the cost of a full rerun can be compared with the
+fragment that replaced it.
+"""
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+import streamlit as st
+
+MAX_SAMPLES = 50
+
+
+def _timings() -> Dict[str, deque]:
+    if 'perf_timings' not in st.session_state:
+        st.session_state.perf_timings = {}
+    return st.session_state.perf_timings
+
+
+def record(label: str, seconds: float):
+    _timings().setdefault(label, deque(maxlen=MAX_SAMPLES)).append(seconds)
+
+
+@contextmanager
+def timed(label: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(label, time.perf_counter() - start)
+
+
+def summary() -> List[Dict[str, float]]:
+    """Per-label run count, last and mean milliseconds."""
+    rows = []
+    for label, samples in _timings().items():
+        rows.append({
+            'label': label,
+            'runs': len(samples),
+            'last_ms': samples[-1] * 1000,
+            'mean_ms': sum(samples) / len(samples) * 1000,
+        })
+    return rows
+
+
+def _rerun_cpu(app, reruns: int) -> float:
+    """Mean CPU milliseconds of `reruns` reruns of an AppTest app."""
+    start = time.process_time()
+    for _ in range(reruns):
+        app.run()
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+    return (time.process_time() - start) / reruns * 1000
+
+
+# Approximate size of the hash reference Streamlit sends for a cached message
+REFERENCE_BYTES = 64
+
+
+def rerun_payload(app, reruns: int) -> Tuple[float, float]:
+    """Mean element bytes per rerun, as built and as sent.
+
+    "As sent" replays Streamlit's message cache: an element at least
+    global.minCachedMessageSize bytes long that the session already received
+    costs only a hash reference.
+    """
+    import streamlit.config
+
+    threshold = streamlit.config.get_option("global.minCachedMessageSize")
+    built = sent = 0
+    seen = set()
+    for _ in range(reruns):
+        app.run()
+        for node in _walk(app._tree):
+            size = node.proto.ByteSize()
+            built += size
+            if size >= threshold:
+                content = node.proto.SerializeToString()
+                sent += REFERENCE_BYTES if content in seen else size
+                seen.add(content)
+            else:
+                sent += size
+    return built / reruns, sent / reruns
+
+
+def _walk(node):
+    children = getattr(node, 'children', None)
+    if children:
+        for child in children.values():
+            yield from _walk(child)
+    elif getattr(node, 'proto', None) is not None:
+        yield node
+
+
+def payload_benchmark(script: str = "home.py", reruns: int = 20):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(script, default_timeout=120).run()
+    built, sent = rerun_payload(app, reruns)
+    print(f"{built:10.0f} bytes built per rerun, {sent:10.0f} bytes sent per rerun")
+
+
+# Modules a cold process imports: the engine alone, the batch CLI and the
+# app-side helpers
+STARTUP_MODULES = ["emissions", "scenarios", "uncertainty", "reactive",
+                   "batch_score", "chatbot", "figures"]
+
+
+def import_time(module: str) -> Tuple[float, int]:
+    """Cumulative import milliseconds of `module` in a fresh interpreter, and
+    how many modules it pulled in, from `python -X importtime`."""
+    import subprocess
+    import sys
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    # Lines after the header read "import time: self | cumulative | name",
+    # with nested imports indented under their parent
+    rows = [line[len("import time:"):].split("|")
+            for line in result.stderr.splitlines()[1:] if line.startswith("import time:")]
+    cumulative_us = next(int(cumulative) for _, cumulative, name in rows if name.strip() == module)
+    return cumulative_us / 1000, len(rows)
+
+
+def startup_benchmark(modules=STARTUP_MODULES):
+    for module in modules:
+        milliseconds, count = import_time(module)
+        print(f"{module:16s} {milliseconds:8.1f} ms  {count:5d} modules imported")
+
+
+def allocations(fn, repeat: int = 1000) -> Tuple[float, int]:
+    """Mean bytes allocated per call of `fn` and the peak traced size, via tracemalloc."""
+    import tracemalloc
+
+    fn()  # warm up caches and interned constants
+    tracemalloc.start()
+    try:
+        allocated = 0
+        for _ in range(repeat):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            result = fn()
+            allocated += tracemalloc.get_traced_memory()[1] - before
+            del result
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return allocated / repeat, peak
+
+
+def allocation_benchmark(repeat: int = 1000):
+    """Per-rerun allocations of building the chatbot versus fetching the shared one."""
+    from chatbot import CarbonFootprintChatbot
+
+    shared = CarbonFootprintChatbot()
+    for label, fn in [("construct per rerun", CarbonFootprintChatbot),
+                      ("shared instance", lambda: shared)]:
+        per_call, _ = allocations(fn, repeat)
+        print(f"{label:20s} {per_call:10.0f} bytes allocated per rerun")
+
+
+def benchmark(script: str = "home.py", reruns: int = 20):
+    """Compare per-rerun CPU of st.tabs navigation with running only the active section."""
+    import os
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["NAVIGATION_MODE"] = "tabs"
+    app = AppTest.from_file(script, default_timeout=120).run()
+    app.button(key="calculate_button").click().run()
+    tabs_ms = _rerun_cpu(app, reruns)
+    print(f"{'tabs (all sections)':24s} {tabs_ms:8.1f} ms CPU per rerun")
+
+    os.environ["NAVIGATION_MODE"] = "sections"
+    app = AppTest.from_file(script, default_timeout=120).run()
+    app.button(key="calculate_button").click().run()
+    for section in app.radio(key="active_section").options:
+        app.radio(key="active_section").set_value(section).run()
+        section_ms = _rerun_cpu(app, reruns)
+        print(f"{section:24s} {section_ms:8.1f} ms CPU per rerun "
+              f"({(1 - section_ms / tabs_ms) * 100:.0f}% saved)")
+
+
+# Sections with fragments, and the fragments each one renders
+FRAGMENT_SECTIONS = {
+    "💬 Chat": ["chat fragment"],
+    "🎮 Challenges": ["weekly challenge fragment", "certificate grid fragment"],
+}
+
+
+def fragment_benchmark(script: str = "home.py", reruns: int = 20):
+    """Wall time of a full rerun of each section with fragments against its
+    fragments alone: what a click inside a fragment cost when it called
+    st.rerun(), and what it costs now."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(script, default_timeout=120).run()
+    app.button(key="calculate_button").click().run()
+    for section, labels in FRAGMENT_SECTIONS.items():
+        app.radio(key="active_section").set_value(section).run()
+        # AppTest always reruns the whole script, and the app times each
+        # fragment inside it, as a fragment-only rerun would run it
+        app.session_state["perf_timings"] = {}
+        for _ in range(reruns):
+            app.run()
+        timings = app.session_state["perf_timings"]
+        full_ms = sum(timings["full rerun"]) / len(timings["full rerun"]) * 1000
+        for label in labels:
+            fragment_ms = sum(timings[label]) / len(timings[label]) * 1000
+            print(f"{label:28s} {full_ms:8.1f} ms full rerun, {fragment_ms:8.1f} ms fragment "
+                  f"({(1 - fragment_ms / full_ms) * 100:.0f}% saved)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure per-rerun CPU of the Streamlit app")
+    parser.add_argument("--script", default="home.py")
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--payload", action="store_true",
+                        help="measure bytes sent per rerun instead of CPU")
+    parser.add_argument("--imports", action="store_true",
+                        help="measure cold import time of the app and engine modules")
+    parser.add_argument("--allocations", action="store_true",
+                        help="measure per-rerun allocations of the chatbot")
+    parser.add_argument("--fragments", action="store_true",
+                        help="compare full reruns with fragment reruns")
+    args = parser.parse_args()
+    if args.fragments:
+        fragment_benchmark(args.script, args.reruns)
+    elif args.allocations:
+        allocation_benchmark()
+    elif args.imports:
+        startup_benchmark()
+    elif args.payload:
+        payload_benchmark(args.script, args.reruns)
+    else:
+        benchmark(args.script, args.reruns)
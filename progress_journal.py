@@ -0,0 +1,197 @@
+"""Append-only journal backend for per-user progress.
+
+Every change is one JSON line of mutations (see progress_store) appended to
+`journal.log`, so a write costs as much as the change, not the whole
+history. A writer thread fsyncs whatever lines are queued in one go
+(group commit), and `apply` returns once its line is on disk. A compaction
+thread periodically writes every user's progress to `snapshot.json` through
+a temporary file and an atomic rename, then drops the journal lines the
+snapshot already covers. At startup the snapshot is loaded and the journal
+tail replayed on top of it.
+
+Selected with PROGRESS_BACKEND=journal. One process owns a journal
+directory; several server processes should use the SQLite store.
+"""
+import copy
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from progress_store import Mutation, apply_mutations
+
+JOURNAL_DIR = os.environ.get(
+    "PROGRESS_JOURNAL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "progress_journal"),
+)
+COMPACT_BYTES = 4 * 1024 * 1024  # Journal size that triggers a compaction
+COMPACT_INTERVAL = 10.0  # Seconds between journal size checks
+
+SNAPSHOT_NAME = "snapshot.json"
+JOURNAL_NAME = "journal.log"
+
+
+class ProgressJournal:
+    def __init__(self, directory: str = JOURNAL_DIR, compact_bytes: int = COMPACT_BYTES,
+                 compact_interval: float = COMPACT_INTERVAL):
+        self.directory = directory
+        self.compact_bytes = compact_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+        self._journal_path = os.path.join(directory, JOURNAL_NAME)
+
+        self._users: Dict[str, Dict[str, Any]] = {}
+        self._sequence = 0  # Last mutation record applied in memory
+        self._durable = 0  # Last record fsynced to the journal
+        self._pending: List[bytes] = []
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        # Guards the in-memory state and the queue; _file_lock guards the
+        # journal file, which compaction swaps out under the writer
+        self._changed = threading.Condition()
+        self._file_lock = threading.Lock()
+
+        self._replay()
+        self._journal = open(self._journal_path, "ab")
+        self._writer = threading.Thread(target=self._write_loop, name="progress-journal", daemon=True)
+        self._writer.start()
+        self._stop_compaction = threading.Event()
+        self._compactor = threading.Thread(target=self._compact_loop, args=(compact_interval,),
+                                           name="progress-compaction", daemon=True)
+        self._compactor.start()
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """The user's saved progress, or None for a new user."""
+        with self._changed:
+            progress = self._users.get(user_id)
+            return copy.deepcopy(progress) if progress is not None else None
+
+    def save(self, user_id: str, progress: Dict[str, Any]):
+        self.apply(user_id, [("set", (), progress)])
+
+    def apply(self, user_id: str, mutations: Sequence[Mutation]):
+        """Apply mutations to the user's progress and wait until they are
+        durable in the journal."""
+        with self._changed:
+            if self._closed:
+                raise ValueError("Progress journal is closed")
+            self._sequence += 1
+            sequence = self._sequence
+            line = json.dumps({"seq": sequence, "user": user_id, "mutations": mutations})
+            # Apply the decoded copy, so the journal never shares objects
+            # with the caller's (still mutable) session state
+            apply_mutations(self._users.setdefault(user_id, {}), json.loads(line)["mutations"])
+            self._pending.append(line.encode("utf-8") + b"\n")
+            self._changed.notify_all()
+            while self._durable < sequence and self._error is None:
+                self._changed.wait()
+            if self._error is not None:
+                raise self._error
+
+    def compact(self):
+        """Snapshot every user's progress and drop the journal lines the
+        snapshot covers."""
+        with self._changed:
+            sequence = self._sequence
+            snapshot = json.dumps({"seq": sequence, "users": self._users})
+        _write_atomically(self._snapshot_path, snapshot.encode("utf-8"))
+
+        with self._file_lock:
+            self._journal.close()
+            with open(self._journal_path, "rb") as f:
+                tail = [line for line in f if _sequence_of(line) > sequence]
+            _write_atomically(self._journal_path, b"".join(tail))
+            self._journal = open(self._journal_path, "ab")
+
+    def journal_size(self) -> int:
+        with self._file_lock:
+            return self._journal.tell()
+
+    def close(self):
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+        self._writer.join()
+        self._stop_compaction.set()
+        self._compactor.join()
+        with self._file_lock:
+            self._journal.close()
+
+    def _replay(self):
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, "rb") as f:
+                snapshot = json.load(f)
+            self._users = snapshot["users"]
+            self._sequence = snapshot["seq"]
+        if not os.path.exists(self._journal_path):
+            self._durable = self._sequence
+            return
+        valid_end = 0
+        with open(self._journal_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Torn final write from a crash; drop it
+                if not line.endswith(b"\n"):
+                    break
+                valid_end += len(line)
+                if record["seq"] > self._sequence:
+                    apply_mutations(self._users.setdefault(record["user"], {}), record["mutations"])
+                    self._sequence = record["seq"]
+        if valid_end < os.path.getsize(self._journal_path):
+            with open(self._journal_path, "r+b") as f:
+                f.truncate(valid_end)
+        self._durable = self._sequence
+
+    def _write_loop(self):
+        while True:
+            with self._changed:
+                while not self._pending and not self._closed:
+                    self._changed.wait()
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                sequence = self._sequence
+            try:
+                with self._file_lock:
+                    self._journal.write(b"".join(batch))
+                    self._journal.flush()
+                    os.fsync(self._journal.fileno())
+            except OSError as error:
+                with self._changed:
+                    self._error = error
+                    self._changed.notify_all()
+                return
+            with self._changed:
+                self._durable = sequence
+                self._changed.notify_all()
+
+    def _compact_loop(self, interval: float):
+        while not self._stop_compaction.wait(interval):
+            if self.journal_size() >= self.compact_bytes:
+                self.compact()
+
+
+def _sequence_of(line: bytes) -> int:
+    try:
+        return json.loads(line)["seq"]
+    except ValueError:
+        return 0
+
+
+def _write_atomically(path: str, data: bytes):
+    """Replace `path` with `data` so readers see the old or the new file,
+    never a partial one, even across a crash."""
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    if hasattr(os, "O_DIRECTORY"):
+        directory = os.open(os.path.dirname(path), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
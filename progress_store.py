@@ -0,0 +1,151 @@
+"""Per-user progress storage in SQLite.
+
+Each user's certificates, challenges, achievements, carbon journey and
+weekly challenge are one JSON document in a table keyed by user ID, so a
+load or save touches one primary-key row however many users there are,
+and concurrent sessions never overwrite each other's progress. The database
+runs in WAL mode: readers do not block the writer, and sessions borrow
+connections from a small per-process pool instead of opening one per rerun.
+
+Changes are described as mutations, `(op, path, value)` tuples: "set"
+replaces the value at `path` (a tuple of keys; the empty path is the whole
+document) and "append" adds `value` to the list at `path`. `diff_progress`
+derives them from two versions of a document, and every backend (see also
+progress_journal.py) accepts them through `apply(user_id, mutations)`.
+"""
+import json
+import os
+import queue
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+DB_PATH = os.environ.get(
+    "PROGRESS_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_progress.db"),
+)
+POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 5000
+
+Mutation = Tuple[str, Sequence[str], Any]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+# Fixed statement texts, so each pooled connection compiles them once and
+# reuses them from sqlite3's per-connection statement cache
+SELECT_PROGRESS = "SELECT data FROM progress WHERE user_id = ?"
+UPSERT_PROGRESS = """
+INSERT INTO progress (user_id, data, updated_at) VALUES (?, ?, ?)
+ON CONFLICT (user_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+"""
+
+
+class ProgressStore:
+    def __init__(self, path: str = DB_PATH, pool_size: int = POOL_SIZE):
+        self.path = path
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=pool_size)
+        with self._connection() as connection:
+            # WAL is a property of the database file; set once, it sticks
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(SCHEMA)
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """The user's saved progress, or None for a new user."""
+        with self._connection() as connection:
+            row = connection.execute(SELECT_PROGRESS, (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, user_id: str, progress: Dict[str, Any]):
+        with self._connection() as connection, connection:
+            connection.execute(UPSERT_PROGRESS, (user_id, json.dumps(progress), time.time()))
+
+    def apply(self, user_id: str, mutations: Sequence[Mutation]):
+        """Apply mutations to the user's progress in one transaction."""
+        with self._connection() as connection:
+            # Take the write lock before reading, so concurrent updates of
+            # the same user are serialized rather than lost
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(SELECT_PROGRESS, (user_id,)).fetchone()
+                progress = json.loads(row[0]) if row else {}
+                apply_mutations(progress, mutations)
+                connection.execute(UPSERT_PROGRESS, (user_id, json.dumps(progress), time.time()))
+            except BaseException:
+                connection.rollback()
+                raise
+            connection.commit()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        # A connection is used by one thread at a time, but not always the
+        # thread that opened it (Streamlit runs reruns on fresh threads)
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA synchronous=NORMAL")
+        try:
+            yield connection
+        finally:
+            try:
+                self._pool.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+
+
+def apply_mutations(progress: Dict[str, Any], mutations: Sequence[Mutation]):
+    """Apply mutations to `progress` in place."""
+    for op, path, value in mutations:
+        if op == "set" and not path:
+            progress.clear()
+            progress.update(value)
+            continue
+        target = progress
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        if op == "set":
+            target[path[-1]] = value
+        elif op == "append":
+            target.setdefault(path[-1], []).append(value)
+        else:
+            raise ValueError(f"Unknown progress mutation {op!r}")
+
+
+def diff_progress(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> List[Mutation]:
+    """Mutations that turn `old` (None for nothing saved) into `new`.
+
+    Changed leaves are set, and items added to the end of a list are
+    appended, so the mutations grow with the change rather than with the
+    document.
+    """
+    if old is None:
+        return [("set", (), new)]
+    return _diff(old, new, ())
+
+
+def _diff(old: Any, new: Any, path: Tuple[str, ...]) -> List[Mutation]:
+    if isinstance(old, dict) and isinstance(new, dict) and old.keys() <= new.keys():
+        mutations: List[Mutation] = []
+        for key, value in new.items():
+            if key not in old:
+                mutations.append(("set", path + (key,), value))
+            elif old[key] != value:
+                mutations.extend(_diff(old[key], value, path + (key,)))
+        return mutations
+    if isinstance(old, list) and isinstance(new, list) and new[:len(old)] == old and path:
+        return [("append", path, item) for item in new[len(old):]]
+    return [("set", path, new)]
@@ -0,0 +1,115 @@
+"""Small dependency-tracked computation graph for the Calculate tab.
+
+Inputs are set from widget values on every rerun; derived nodes are pulled
+lazily and recompute only when a dependency's version changed. A node whose
+recomputed value equals its previous one keeps its version, so changes stop
+propagating there (e.g. switching diet never touches the transport node,
+and a total that did not change never re-derives the status).
+"""
+from typing import Any, Callable, Dict, Sequence, Tuple
+
+_MISSING = object()
+
+
+class Graph:
+    def __init__(self):
+        self._inputs: Dict[str, Tuple[Any, int]] = {}
+        self._nodes: Dict[str, Tuple[Sequence[str], Callable]] = {}
+        self._cache: Dict[str, Tuple[Any, int, Tuple[int, ...]]] = {}
+        self._seen_this_run = set()
+        self.computed = 0
+        self.skipped = 0
+
+    def add_node(self, name: str, deps: Sequence[str], fn: Callable):
+        if name in self._inputs:
+            raise ValueError(f"{name!r} is already an input")
+        self._nodes[name] = (tuple(deps), fn)
+
+    def set_input(self, name: str, value):
+        if name in self._nodes:
+            raise ValueError(f"{name!r} is a derived node, not an input")
+        old_value, version = self._inputs.get(name, (_MISSING, 0))
+        if old_value is _MISSING or not _same(old_value, value):
+            self._inputs[name] = (value, version + 1)
+
+    def begin_run(self):
+        """Reset the per-rerun counters."""
+        self._seen_this_run.clear()
+        self.computed = 0
+        self.skipped = 0
+
+    def get(self, name: str):
+        return self._resolve(name)[0]
+
+    def _resolve(self, name: str) -> Tuple[Any, int]:
+        if name in self._inputs:
+            return self._inputs[name]
+        if name not in self._nodes:
+            raise KeyError(f"Unknown input or node {name!r}")
+
+        deps, fn = self._nodes[name]
+        resolved = [self._resolve(dep) for dep in deps]
+        dep_versions = tuple(version for _, version in resolved)
+        cached = self._cache.get(name)
+        first_visit = name not in self._seen_this_run
+        self._seen_this_run.add(name)
+        if cached is not None and cached[2] == dep_versions:
+            if first_visit:
+                self.skipped += 1
+            return cached[0], cached[1]
+
+        value = fn(*(dep_value for dep_value, _ in resolved))
+        if first_visit:
+            self.computed += 1
+        version = 1
+        if cached is not None:
+            version = cached[1] if _same(cached[0], value) else cached[1] + 1
+            value = cached[0] if version == cached[1] else value
+        self._cache[name] = (value, version, dep_versions)
+        return value, version
+
+    @property
+    def node_count(self) -> int:
+        return len(self._nodes)
+
+
+def _same(a, b) -> bool:
+    try:
+        return bool(a is b or a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+CATEGORY_LABELS = {
+    "transport": "Transportation",
+    "energy": "Energy",
+    "waste": "Waste",
+    "diet": "Diet",
+}
+
+
+def calculation_graph() -> Graph:
+    """Graph over the Calculate tab inputs.
+
+    Inputs: surfaces (scenarios.ScenarioSurfaces), transport_mode, distance,
+    flights, electricity, fuel_code, fuel_consumption, waste_amounts, diet_code,
+    meals_per_day, result_total (t CO2 or None) and global_average.
+    """
+    graph = Graph()
+    graph.add_node("transport", ["surfaces", "transport_mode", "distance", "flights"],
+                   lambda surfaces, mode, distance, flights: surfaces.transport(mode, distance, flights))
+    graph.add_node("energy", ["surfaces", "electricity", "fuel_code", "fuel_consumption"],
+                   lambda surfaces, electricity, fuel, amount: surfaces.energy(electricity, fuel, amount))
+    graph.add_node("waste", ["surfaces", "waste_amounts"],
+                   lambda surfaces, waste: surfaces.waste_total(waste))
+    graph.add_node("diet", ["surfaces", "diet_code", "meals_per_day"],
+                   lambda surfaces, diet, meals: surfaces.diet(diet, meals))
+    for category in CATEGORY_LABELS:
+        graph.add_node(f"{category}_preview", [category], lambda value: f"{value/1000:.1f}")
+    graph.add_node("total", list(CATEGORY_LABELS), lambda *values: sum(values))
+    graph.add_node("total_preview", ["total"], lambda value: f"{value/1000:.1f}")
+    graph.add_node("highest", list(CATEGORY_LABELS),
+                   lambda *values: max(zip(CATEGORY_LABELS.values(), values), key=lambda x: x[1]))
+    graph.add_node("status", ["result_total", "global_average"],
+                   lambda total, average: total is not None and total < average)
+    return graph
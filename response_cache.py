@@ -0,0 +1,63 @@
+"""Thread-safe, size-bounded LRU cache for chatbot answers.
+
+One cache is shared by every session through the process-wide chatbot, so
+the suggested questions and their near-duplicates are answered once. Entries
+belong to a knowledge version; when the chatbot's tables change, the cache
+is emptied before it answers from the new ones.
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_MAXSIZE = 1024
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.version: Optional[Hashable] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T], version: Hashable = None) -> T:
+        """Cached value for `key`, computing and storing it on a miss.
+
+        `compute` runs outside the lock, so a slow answer never blocks other
+        sessions; two threads missing on the same key may both compute it.
+        """
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            if version == self.version:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,109 @@
+"""BM25 passage retrieval over the chatbot's knowledge base.
+
+Articles are split into passages at blank lines and indexed once into a
+sparse inverted index (term -> postings of passage id and precomputed BM25
+weight). A query touches only the postings of its own terms, so lookups stay
+well under a millisecond as the corpus grows to thousands of articles.
+"""
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+# BM25 term-frequency saturation and length normalization
+K1 = 1.5
+B = 0.75
+
+# Passages with fewer terms than this are headings, not answers
+MIN_PASSAGE_TERMS = 4
+
+STOP_WORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it me my of on or
+our so some that the their this to up us was we what when which while who
+why will with would you your
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Shorter tokens are contraction and possessive leftovers ("what's" ->
+# "what", "s") or units, and match passages by accident
+MIN_TERM_LENGTH = 3
+
+# Inflections stripped from terms so "emissions" finds "emission" and
+# "transportation" finds "transport"; longest first
+STEM_SUFFIXES = ("ations", "ation", "ing", "ed", "es", "s")
+
+
+class Passage(NamedTuple):
+    topic: str
+    text: str
+
+
+class Hit(NamedTuple):
+    score: float
+    passage: Passage
+
+
+def stem(token: str) -> str:
+    for suffix in STEM_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(token) for token in _TOKEN.findall(text.lower())
+            if len(token) >= MIN_TERM_LENGTH and token not in STOP_WORDS]
+
+
+def split_passages(articles: Mapping[str, Sequence[str]],
+                   exclude: Iterable[str] = ()) -> List[Passage]:
+    """Split {topic: articles} into blank-line separated passages."""
+    exclude = set(exclude)
+    passages = []
+    for topic, texts in articles.items():
+        if topic in exclude:
+            continue
+        for text in texts:
+            for chunk in text.split("\n\n"):
+                chunk = chunk.strip()
+                # Closing questions ("Would you like to ...?") are sign-offs
+                if len(tokenize(chunk)) >= MIN_PASSAGE_TERMS and not chunk.endswith("?"):
+                    passages.append(Passage(topic, chunk))
+    return passages
+
+
+class PassageIndex:
+    """Immutable BM25 inverted index over a list of passages."""
+
+    def __init__(self, passages: Sequence[Passage], k1: float = K1, b: float = B):
+        self.passages = tuple(passages)
+        term_counts = [Counter(tokenize(passage.text)) for passage in self.passages]
+        lengths = [sum(counts.values()) for counts in term_counts]
+        average_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for passage_id, counts in enumerate(term_counts):
+            norm = k1 * (1 - b + b * lengths[passage_id] / average_length)
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((passage_id, tf * (k1 + 1) / (tf + norm)))
+
+        n = len(self.passages)
+        self._postings: Dict[str, Tuple[Tuple[int, float], ...]] = {}
+        for term, entries in postings.items():
+            idf = math.log(1 + (n - len(entries) + 0.5) / (len(entries) + 0.5))
+            self._postings[term] = tuple((passage_id, idf * weight) for passage_id, weight in entries)
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def search(self, query: str, k: int = 3, topic: Optional[str] = None) -> List[Hit]:
+        """The `k` best-scoring passages for `query`, best first; only
+        passages of `topic` when one is given."""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            for passage_id, weight in self._postings.get(term, ()):
+                if topic is None or self.passages[passage_id].topic == topic:
+                    scores[passage_id] = scores.get(passage_id, 0.0) + weight
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [Hit(score, self.passages[passage_id]) for passage_id, score in best]
@@ -0,0 +1,137 @@
+"""Precomputed what-if surfaces over the Calculate tab's slider grids.
+
+Each slider only takes values on a fixed grid (min, max, step), so the
+emissions for every position can be swept once per factor snapshot and
+region. Previews, "what if I cut X by 20%" comparisons and sensitivity
+curves then become array lookups instead of formula evaluations.
+"""
+from functools import lru_cache
+from typing import Dict, NamedTuple, Tuple
+
+import numpy as np
+
+import emissions
+import factors
+
+
+class SliderGrid(NamedTuple):
+    label: str
+    low: float
+    high: float
+    default: float
+    step: float
+
+    @property
+    def values(self) -> np.ndarray:
+        return np.linspace(self.low, self.high, self.size)
+
+    @property
+    def size(self) -> int:
+        return int(round((self.high - self.low) / self.step)) + 1
+
+    def index(self, value) -> np.ndarray:
+        """Grid position of `value`, clipped to the slider range."""
+        position = np.rint((np.asarray(value, dtype=np.float64) - self.low) / self.step)
+        return np.clip(position, 0, self.size - 1).astype(np.intp)
+
+
+# Slider definitions shared with the Calculate tab; float sliders use
+# Streamlit's default 0.01 step
+SLIDERS: Dict[str, SliderGrid] = {
+    "distance": SliderGrid("Daily commute distance (km)", 0.0, 100.0, 10.0, 0.01),
+    "flights": SliderGrid("Number of flights per year", 0, 50, 0, 1),
+    "electricity": SliderGrid("Monthly electricity (kWh)", 0.0, 1000.0, 200.0, 0.01),
+    "fuel": SliderGrid("Monthly {} consumption (kg)", 0.0, 50.0, 10.0, 0.01),
+    "Organic": SliderGrid("Weekly organic waste (kg)", 0.0, 20.0, 2.0, 0.01),
+    "Plastic": SliderGrid("Weekly plastic waste (kg)", 0.0, 10.0, 1.0, 0.01),
+    "Paper": SliderGrid("Weekly paper waste (kg)", 0.0, 10.0, 1.0, 0.01),
+    "Metal": SliderGrid("Weekly metal waste (kg)", 0.0, 5.0, 0.5, 0.01),
+    "meals": SliderGrid("Number of meals per day", 1, 5, 3, 1),
+}
+
+# Slider -> emission category it feeds
+SLIDER_CATEGORIES = {
+    "distance": "transport", "flights": "transport",
+    "electricity": "energy", "fuel": "energy",
+    "Organic": "waste", "Plastic": "waste", "Paper": "waste", "Metal": "waste",
+    "meals": "diet",
+}
+
+
+class ScenarioSurfaces:
+    """Annual kg CO2e for every slider position, per option code."""
+
+    def __init__(self, store: factors.FactorStore, region):
+        row = store.resolve(region)
+        self.key: Tuple[str, str] = store.keys[int(row)]
+
+        def sweep(name):
+            return SLIDERS[name].values
+
+        transport_modes = np.arange(len(emissions.TRANSPORT_MODES))[:, None]
+        self.distance = emissions.transport_emissions(sweep("distance"), transport_modes, 0, row, store)
+        self.flights = emissions.transport_emissions(0.0, emissions.AIRPLANE, sweep("flights"), row, store)
+        self.electricity = emissions.energy_emissions(sweep("electricity"), 0, 0, row, store)
+        cooking_fuels = np.arange(len(emissions.COOKING_FUELS))[:, None]
+        self.fuel = emissions.energy_emissions(0.0, cooking_fuels, sweep("fuel"), row, store)
+        self.waste = {}
+        for code, waste_type in enumerate(emissions.WASTE_TYPES):
+            amounts = np.zeros((SLIDERS[waste_type].size, len(emissions.WASTE_TYPES)))
+            amounts[:, code] = sweep(waste_type)
+            self.waste[waste_type] = emissions.waste_emissions(amounts, row, store)
+        diets = np.arange(len(emissions.DIET_TYPES))[:, None]
+        self.meals = emissions.diet_emissions(sweep("meals"), diets, row, store)
+        for array in [self.distance, self.flights, self.electricity, self.fuel,
+                      self.meals, *self.waste.values()]:
+            array.flags.writeable = False
+
+    def transport(self, mode: int, distance: float, flights: int = 0) -> float:
+        value = self.distance[mode, SLIDERS["distance"].index(distance)]
+        if mode == emissions.AIRPLANE:
+            value += self.flights[SLIDERS["flights"].index(flights)]
+        return float(value)
+
+    def energy(self, electricity: float, cooking_fuel: int, fuel_consumption: float = 0) -> float:
+        return float(self.electricity[SLIDERS["electricity"].index(electricity)]
+                     + self.fuel[cooking_fuel, SLIDERS["fuel"].index(fuel_consumption)])
+
+    def waste_total(self, waste: Dict[str, float]) -> float:
+        return float(sum(self.waste[waste_type][SLIDERS[waste_type].index(waste[waste_type])]
+                         for waste_type in emissions.WASTE_TYPES))
+
+    def diet(self, diet: int, meals_per_day: int) -> float:
+        return float(self.meals[diet, SLIDERS["meals"].index(meals_per_day)])
+
+    def curve(self, slider: str, option: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """Slider positions and the emissions each one contributes, for a sensitivity chart.
+
+        `option` is the transport mode, cooking fuel or diet code where the
+        slider's effect depends on it.
+        """
+        if slider == "distance":
+            surface = self.distance[option]
+        elif slider == "fuel":
+            surface = self.fuel[option]
+        elif slider == "meals":
+            surface = self.meals[option]
+        elif slider in self.waste:
+            surface = self.waste[slider]
+        else:
+            surface = getattr(self, slider)
+        return SLIDERS[slider].values, surface
+
+    def what_if(self, slider: str, value: float, cut: float = 0.2, option: int = 0) -> float:
+        """kg CO2e per year saved by lowering `slider` from `value` by `cut` (0.2 = 20%)."""
+        _, surface = self.curve(slider, option)
+        grid = SLIDERS[slider]
+        return float(surface[grid.index(value)] - surface[grid.index(value * (1 - cut))])
+
+
+@lru_cache(maxsize=32)
+def get_surfaces(store: factors.FactorStore, region) -> ScenarioSurfaces:
+    """Surfaces for one factor snapshot and region, built on first use.
+
+    Stores are immutable and hashed by identity, so a hot-reloaded factor
+    file gets fresh surfaces and old ones age out of the cache.
+    """
+    return ScenarioSurfaces(store, region)
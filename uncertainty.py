@@ -0,0 +1,84 @@
+"""Monte Carlo uncertainty bands for footprint results.
+
+Each emission factor is drawn from a lognormal distribution whose mean is
+the factor and whose coefficient of variation is stored alongside it in the
+factor set. With profiles as an (N, activity) quantity matrix and M sampled
+factor vectors as an (M, activity) matrix, every sample for every profile
+is one matrix product. Profiles are processed in chunks sized so each
+(chunk, M) block stays under a memory budget.
+"""
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+
+import emissions
+import factors
+
+DEFAULT_SAMPLES = 10_000
+DEFAULT_PERCENTILES = (5, 50, 95)
+MAX_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def sample_factors(store: factors.FactorStore, region, samples: int = DEFAULT_SAMPLES,
+                   seed: Optional[int] = 0) -> np.ndarray:
+    """Draw an (M, activity) matrix of factor vectors for one factor set.
+
+    A fixed seed gives every chunk and every rerun the same draws, so
+    bands are reproducible and comparable between profiles.
+    """
+    row = int(store.resolve(region))
+    mean = np.nan_to_num(store.matrix[row])
+    cv = store.uncertainty[row]
+    sigma = np.sqrt(np.log1p(cv ** 2))
+    mu = np.log(np.where(mean > 0, mean, 1.0)) - sigma ** 2 / 2
+    rng = np.random.default_rng(seed)
+    draws = np.exp(mu + sigma * rng.standard_normal((samples, len(mean))))
+    return np.where(mean > 0, draws, 0.0)
+
+
+def iter_bands(quantities: np.ndarray, factor_samples: np.ndarray,
+               percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+               max_chunk_bytes: int = MAX_CHUNK_BYTES) -> Iterator[Dict[str, np.ndarray]]:
+    """Yield per-chunk bands: category -> (chunk, len(percentiles)) kg CO2e."""
+    samples = len(factor_samples)
+    # Running total, one category block and the percentile scratch copy
+    chunk = max(1, max_chunk_bytes // (3 * samples * 8))
+    for start in range(0, len(quantities), chunk):
+        block = quantities[start:start + chunk]
+        total = np.zeros((len(block), samples))
+        bands = {}
+        for category, activities in emissions.CATEGORY_ACTIVITIES.items():
+            draws = block[:, activities] @ factor_samples[:, activities].T
+            total += draws
+            bands[category] = np.percentile(draws, percentiles, axis=1).T
+        bands["total"] = np.percentile(total, percentiles, axis=1).T
+        yield bands
+
+
+def uncertainty_bands(quantities: np.ndarray, region=emissions.DEFAULT_REGION,
+                      store: Optional[factors.FactorStore] = None,
+                      samples: int = DEFAULT_SAMPLES,
+                      percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                      seed: Optional[int] = 0,
+                      max_chunk_bytes: int = MAX_CHUNK_BYTES) -> Dict[str, np.ndarray]:
+    """Percentile bands for N profiles (see `emissions.activity_quantities`).
+
+    `region` may be one region or an array of per-row factor set codes;
+    rows are grouped so each factor set is sampled once. Returns
+    category -> (N, len(percentiles)) kg CO2e, plus "total".
+    """
+    store = store or factors.DEFAULT_STORE
+    quantities = np.atleast_2d(quantities)
+    rows = np.broadcast_to(store.resolve(region), (len(quantities),))
+    bands = {category: np.empty((len(quantities), len(percentiles)))
+             for category in emissions.CATEGORIES + ["total"]}
+    for row in np.unique(rows):
+        selected = np.flatnonzero(rows == row)
+        factor_samples = sample_factors(store, row, samples, seed)
+        offset = 0
+        for chunk in iter_bands(quantities[selected], factor_samples, percentiles, max_chunk_bytes):
+            size = len(chunk["total"])
+            for category, values in chunk.items():
+                bands[category][selected[offset:offset + size]] = values
+            offset += size
+    return bands